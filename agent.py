@@ -1,31 +1,570 @@
-from agent_framework import Agent,Tool
-from urllib.parse import quote_plus
+from agent_framework import Agent,Tool,Cassette
+from urllib.parse import quote_plus,urlsplit,urlunsplit,parse_qsl,urlencode
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime,timedelta,timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional,Dict,Any,List,Callable
+import base64
+import hashlib
 import json
+import os
+import re
+import threading
+import time
 import requests
-from bs4 import BeautifulSoup
+from requests.structures import CaseInsensitiveDict
+from bs4 import BeautifulSoup,Tag,NavigableString,Comment
+
+
+# One pooled session for every tool, so connections are reused and a
+# cassette can be mounted in one place
+http_session=requests.Session()
+
+
+class CassetteAdapter(requests.adapters.HTTPAdapter):
+    """Transport adapter that records or replays HTTP exchanges through a Cassette"""
+
+    def __init__(self,cassette:Cassette,**kwargs):
+        super().__init__(**kwargs)
+        self.cassette=cassette
+
+    @staticmethod
+    def request_key(request:requests.PreparedRequest)->str:
+        """Method, URL with sorted query and a body hash"""
+        parts=urlsplit(request.url)
+        query=urlencode(sorted(parse_qsl(parts.query,keep_blank_values=True)))
+        url=urlunsplit((parts.scheme.lower(),parts.netloc.lower(),parts.path or "/",query,""))
+        key=f"http:{request.method} {url}"
+        if request.body:
+            body=request.body if isinstance(request.body,bytes) else str(request.body).encode()
+            key+=" "+hashlib.sha256(body).hexdigest()[:16]
+        return key
+
+    def send(self,request,**kwargs):
+        def live()->dict:
+            response=super(CassetteAdapter,self).send(request,**kwargs)
+            return {
+                "status":response.status_code,
+                "reason":response.reason,
+                "url":response.url,
+                "headers":dict(response.headers),
+                "body":base64.b64encode(response.content).decode("ascii")
+            }
+        recorded=self.cassette.call(self.request_key(request),live,kind="http")
+
+        response=requests.Response()
+        response.status_code=recorded["status"]
+        response.reason=recorded["reason"]
+        response.url=recorded["url"]
+        response.headers=CaseInsensitiveDict(recorded["headers"])
+        # Content is already decoded, so the encoding headers no longer apply
+        response.headers.pop("Content-Encoding",None)
+        response.headers.pop("Transfer-Encoding",None)
+        response._content=base64.b64decode(recorded["body"])
+        response._content_consumed=True
+        response.encoding=requests.utils.get_encoding_from_headers(response.headers)
+        response.request=request
+        return response
+
+
+def use_cassette(cassette:Cassette,session:Optional[requests.Session]=None)->Cassette:
+    """Route the tools' HTTP traffic through a cassette"""
+    adapter=CassetteAdapter(cassette)
+    for prefix in ("http://","https://"):
+        (session or http_session).mount(prefix,adapter)
+    return cassette
+
+
+class HttpCache:
+    """Disk cache for GET requests that revalidates with ETag/Last-Modified.
+
+    At most max_entries responses are kept; the least recently stored are removed first.
+    """
+
+    def __init__(self,cache_dir:str=".http_cache",default_max_age:int=0,stale_while_revalidate:int=0,session:Optional[requests.Session]=None,max_entries:int=1000):
+        self.cache_dir=cache_dir
+        self.max_entries=max_entries
+        self.default_max_age=default_max_age
+        self.stale_while_revalidate=stale_while_revalidate
+        self.session=session or http_session
+        self.stats={"hits":0,"stale_hits":0,"revalidated":0,"misses":0,"bytes_downloaded":0}
+        self._revalidating=set()
+        self._lock=threading.Lock()
+        os.makedirs(cache_dir,exist_ok=True)
+
+    def _paths(self,url:str)->tuple:
+        key=hashlib.sha256(url.encode()).hexdigest()
+        base=os.path.join(self.cache_dir,key)
+        return base + ".json",base + ".body"
+
+    def _load(self,url:str)->Optional[Dict[str,Any]]:
+        meta_path,body_path=self._paths(url)
+        try:
+            with open(meta_path) as f:
+                entry=json.load(f)
+            with open(body_path,"rb") as f:
+                entry["body"]=f.read()
+            return entry
+        except (OSError,ValueError):
+            return None
+
+    def _save(self,url:str,entry:Dict[str,Any]):
+        meta_path,body_path=self._paths(url)
+        meta={k:v for k,v in entry.items() if k!="body"}
+        for path,data,mode in ((body_path,entry["body"],"wb"),(meta_path,json.dumps(meta),"w")):
+            tmp=f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp,mode) as f:
+                f.write(data)
+            os.replace(tmp,path)
+
+    def _freshness(self,headers)->tuple:
+        """Returns (max_age,stale_while_revalidate,storable) from Cache-Control
+
+        The server's stale-while-revalidate wins over the constructor default;
+        no-cache means revalidate before every use and must-revalidate means a
+        stale copy is never served, so both close the stale window.
+        """
+        max_age=self.default_max_age
+        swr=self.stale_while_revalidate
+        storable=True
+        no_cache=False
+        no_stale=False
+        has_max_age=False
+        for directive in headers.get("Cache-Control","").lower().split(","):
+            name,_,value=directive.strip().partition("=")
+            if name=="no-store":
+                storable=False
+            elif name=="no-cache":
+                no_cache=True
+            elif name in ("must-revalidate","proxy-revalidate"):
+                no_stale=True
+            elif name=="max-age" and value.isdigit():
+                max_age=int(value)
+                has_max_age=True
+            elif name=="stale-while-revalidate" and value.isdigit():
+                swr=int(value)
+        if not has_max_age and headers.get("Expires") and headers.get("Date"):
+            try:
+                max_age=max(0,int((parsedate_to_datetime(headers["Expires"])-parsedate_to_datetime(headers["Date"])).total_seconds()))
+            except (TypeError,ValueError):
+                pass
+        if no_cache:
+            max_age=0
+        if no_cache or no_stale:
+            swr=0
+        return max_age,swr,storable
+
+    def _entry_from(self,response:requests.Response)->Optional[Dict[str,Any]]:
+        max_age,swr,storable=self._freshness(response.headers)
+        if not storable or not (response.headers.get("ETag") or response.headers.get("Last-Modified") or max_age):
+            return None
+        return {
+            "url":response.url,
+            "stored_at":time.time(),
+            "max_age":max_age,
+            "stale_while_revalidate":swr,
+            "headers":{k:v for k,v in response.headers.items() if k.lower() in ("etag","last-modified","content-type","cache-control")},
+            "body":response.content
+        }
+
+    def _to_response(self,url:str,entry:Dict[str,Any])->requests.Response:
+        response=requests.Response()
+        response.status_code=200
+        response.url=url
+        response.headers=CaseInsensitiveDict(entry["headers"])
+        response._content=entry["body"]
+        response.encoding=requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache=True
+        return response
+
+    def _fetch(self,url:str,headers:Dict[str,str],timeout:float,entry:Optional[Dict[str,Any]])->requests.Response:
+        """Conditional GET; refreshes or replaces the stored entry"""
+        request_headers=dict(headers)
+        if entry:
+            if entry["headers"].get("ETag"):
+                request_headers["If-None-Match"]=entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                request_headers["If-Modified-Since"]=entry["headers"]["Last-Modified"]
+
+        response=self.session.get(url,headers=request_headers,timeout=timeout)
+
+        if response.status_code==304 and entry:
+            self.stats["revalidated"]+=1
+            max_age,swr,_=self._freshness(response.headers)
+            entry.update(stored_at=time.time(),max_age=max_age,stale_while_revalidate=swr)
+            for name in ("ETag","Last-Modified","Cache-Control"):
+                if response.headers.get(name):
+                    entry["headers"][name]=response.headers[name]
+            self._save(url,entry)
+            return self._to_response(url,entry)
+
+        self.stats["misses"]+=1
+        self.stats["bytes_downloaded"]+=len(response.content)
+        response.from_cache=False
+        if response.status_code==200:
+            new_entry=self._entry_from(response)
+            if new_entry:
+                self._save(url,new_entry)
+                self._evict()
+        return response
+
+    def _revalidate_in_background(self,url:str,headers:Dict[str,str],timeout:float,entry:Dict[str,Any]):
+        with self._lock:
+            if url in self._revalidating:
+                return
+            self._revalidating.add(url)
+
+        def run():
+            try:
+                self._fetch(url,headers,timeout,entry)
+            except (requests.exceptions.RequestException,OSError) as e:
+                print(f"Background revalidation failed for {url}:{e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(url)
+
+        threading.Thread(target=run,daemon=True).start()
+
+    def get(self,url:str,headers:Optional[Dict[str,str]]=None,timeout:float=10)->requests.Response:
+        """GET through the cache, returns a requests.Response"""
+        headers=headers or {}
+        entry=self._load(url)
+        if entry:
+            age=time.time()-entry["stored_at"]
+            if age<entry["max_age"]:
+                self.stats["hits"]+=1
+                return self._to_response(url,entry)
+            if age<entry["max_age"]+entry["stale_while_revalidate"]:
+                self.stats["stale_hits"]+=1
+                self._revalidate_in_background(url,headers,timeout,dict(entry,headers=dict(entry["headers"])))
+                return self._to_response(url,entry)
+        return self._fetch(url,headers,timeout,entry)
+
+    def _evict(self):
+        """Drop the oldest entries once the cache holds more than max_entries"""
+        metas=[entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".json")]
+        if len(metas)<=self.max_entries:
+            return
+        metas.sort(key=lambda entry:entry.stat().st_mtime)
+        for entry in metas[:len(metas)-self.max_entries]:
+            base=entry.path[:-len(".json")]
+            for path in (entry.path,base + ".body"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        """Remove every cached response"""
+        for name in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir,name))
+
+
+default_http_cache=None
+
+def get_http_cache()->HttpCache:
+    """Shared cache for tools that were not given one"""
+    global default_http_cache
+    if default_http_cache is None:
+        default_http_cache=HttpCache()
+    return default_http_cache
+
+
+def compile_selector(attrs:Optional[Dict[str,Any]]=None)->Optional[Callable]:
+    """Turns {'class':'g'} into a predicate on a Tag, None when any tag matches.
+
+    Attribute values may be True (present), a class name, a string to
+    compare with, or a callable taking the attribute value.
+    """
+    checks=[]
+    for attr,expected in (attrs or {}).items():
+        if expected is True:
+            checks.append(lambda tag,attr=attr:attr in tag.attrs)
+        elif callable(expected):
+            checks.append(lambda tag,attr=attr,fn=expected:attr in tag.attrs and bool(fn(tag.attrs[attr])))
+        elif attr=="class":
+            checks.append(lambda tag,expected=expected:expected in (tag.attrs.get("class") or ()))
+        else:
+            checks.append(lambda tag,attr=attr,expected=expected:tag.attrs.get(attr)==expected)
+    if not checks:
+        return None
+    if len(checks)==1:
+        return checks[0]
+    return lambda tag:all(check(tag) for check in checks)
+
+
+class ExtractionRules:
+    """Container and field selectors, all fallbacks matched in one walk of the page.
+
+    containers: [(name,attrs) or (name,attrs,{field:min_length}),...] in
+    priority order; the page is answered from the best priority that
+    produced any valid result.
+    fields: {field:{"selectors":[(name,attrs),...],"attr":"href"|None,"strip":bool,
+    "with":{other_field:attr}}} where attr None means the element text;
+    selectors are fallbacks in priority order and the first element in
+    document order wins per selector. "with" reads other fields from the
+    same element, so e.g. a title and its link always come from one anchor.
+    """
+
+    def __init__(self,containers:List[tuple],fields:Dict[str,Dict[str,Any]],required:tuple=()):
+        self.priorities=len(containers)
+        self.field_names=list(fields)+[other for spec in fields.values() for other in spec.get("with",{})]
+        self.required=required
+        self.min_lengths=[container[2] if len(container)>2 else {} for container in containers]
+        # Selectors are indexed by tag name so most nodes cost one dict lookup
+        self.container_index:Dict[str,List[tuple]]={}
+        for priority,(name,attrs,*_) in enumerate(containers):
+            self.container_index.setdefault(name,[]).append((priority,compile_selector(attrs)))
+        self.field_index:Dict[str,List[tuple]]={}
+        for field,spec in fields.items():
+            for rank,(name,attrs) in enumerate(spec["selectors"]):
+                self.field_index.setdefault(name,[]).append(
+                    (field,rank,compile_selector(attrs),spec.get("attr"),spec.get("strip",False),spec.get("with",{}))
+                )
+
+    def _finish(self,priority:int,record:Dict[str,Any])->Optional[Dict[str,str]]:
+        result={field:found[1] for field,found in record.items() if found}
+        for field in self.required:
+            if not result.get(field):
+                return None
+        for field,min_length in self.min_lengths[priority].items():
+            if len(result.get(field,""))<min_length:
+                return None
+        return result
+
+    def extract(self,soup,limit:int)->List[Dict[str,str]]:
+        """Walks the tree once; stops when the top-priority container yields `limit` results"""
+        buckets=[[] for _ in range(self.priorities)]
+        container_index=self.container_index
+        field_index=self.field_index
+        stack=[(soup,())]
+        while stack:
+            node,records=stack.pop()
+            if node.__class__ is tuple:
+                priority,record=node
+                result=self._finish(priority,record)
+                if result and len(buckets[priority])<limit:
+                    buckets[priority].append(result)
+                    if priority==0 and len(buckets[0])>=limit:
+                        break
+                continue
+
+            name=node.name
+            opened=None
+            for priority,matches in container_index.get(name,()):
+                if matches is None or matches(node):
+                    if opened is None:
+                        opened=[]
+                    opened.append((priority,dict.fromkeys(self.field_names)))
+            if opened:
+                records=records+tuple(opened)
+                for closing in reversed(opened):
+                    stack.append((closing,()))
+
+            if records and name in field_index:
+                for field,rank,matches,attr,strip,extra in field_index[name]:
+                    if matches is not None and not matches(node):
+                        continue
+                    value=None
+                    for _,record in records:
+                        best=record[field]
+                        if best is not None and best[0]<=rank:
+                            continue
+                        if value is None:
+                            value=node.attrs.get(attr) if attr else node.get_text(strip=strip)
+                        if value:
+                            record[field]=(rank,value)
+                            for other,other_attr in extra.items():
+                                record[other]=(rank,node.attrs.get(other_attr,""))
+
+            for child in reversed(node.contents):
+                if isinstance(child,Tag):
+                    stack.append((child,records))
+
+        for bucket in buckets:
+            if bucket:
+                return bucket
+        return []
+
+
+GOOGLE_RESULT_RULES=ExtractionRules(
+    containers=[('div',{'class':'g'}),('div',{'data-sokoban-container':True}),('div',{'class':'tF2Cxc'})],
+    fields={
+        "title":{"selectors":[('h3',None)]},
+        "link":{"selectors":[('a',{'href':True})],"attr":"href"},
+        "snippet":{"selectors":[('div',{'class':'VwiC3b'}),('span',{'class':'aCOpRe'}),('div',{'class':'s'})]}
+    },
+    required=("title","link")
+)
+
+NEWS_ARTICLE_RULES=ExtractionRules(
+    containers=[('article',None),('a',{'href':lambda href:'./articles/' in href},{"title":21})],
+    fields={
+        "title":{"selectors":[('a',None)],"strip":True,"with":{"link":"href"}}
+    },
+    required=("title",)
+)
+
+
+BLOCK_TAGS={
+    "p","div","li","td","th","dd","dt","h1","h2","h3","h4","h5","h6","pre","blockquote",
+    "article","section","main","figcaption","caption","tr","ul","ol","table","body"
+}
+SKIP_TAGS={"script","style","noscript","template","svg","iframe","nav","aside","footer","form","button","select","option","head"}
+
+
+def text_blocks(soup)->List[Dict[str,Any]]:
+    """Splits a page into blocks of text, one per nearest block-level element"""
+    blocks=[]
+    by_element={}
+    stack=[(soup,None,False)]
+    while stack:
+        node,block,in_link=stack.pop()
+        if isinstance(node,Tag):
+            if node.name in SKIP_TAGS or node.has_attr("hidden") or node.get("aria-hidden")=="true":
+                continue
+            if node.name in BLOCK_TAGS:
+                block=node
+            in_link=in_link or node.name=="a"
+            for child in reversed(node.contents):
+                stack.append((child,block,in_link))
+        elif isinstance(node,NavigableString) and not isinstance(node,Comment):
+            text=" ".join(node.split())
+            if not text or block is None:
+                continue
+            entry=by_element.get(id(block))
+            if entry is None:
+                entry=by_element[id(block)]={"tag":block.name,"parts":[],"link_chars":0}
+                blocks.append(entry)
+            entry["parts"].append(text)
+            if in_link:
+                entry["link_chars"]+=len(text)
+    for entry in blocks:
+        entry["text"]=" ".join(entry.pop("parts"))
+    return blocks
+
+
+def score_block(block:Dict[str,Any])->float:
+    """Higher for long, sentence-like text with few links; 0 for navigation-like blocks"""
+    text=block["text"]
+    words=len(text.split())
+    if words<4 and block["tag"] not in ("h1","h2"):
+        return 0.0
+    link_density=block["link_chars"]/len(text)
+    if link_density>0.5:
+        return 0.0
+    punctuation=sum(text.count(mark) for mark in ".,;:!?")
+    return len(text)*(1-link_density)*(1+min(punctuation/words,1.0))
+
+
+class BoilerplateIndex:
+    """Per-host index of word shingles already seen on other pages of the site"""
+
+    def __init__(self,shingle_size:int=4,threshold:float=0.8,max_hosts:int=256,max_shingles:int=50000):
+        self.shingle_size=shingle_size
+        self.threshold=threshold
+        self.max_hosts=max_hosts
+        self.max_shingles=max_shingles
+        self.hosts:"OrderedDict[str,Dict[int,str]]"=OrderedDict()
+        self._lock=threading.Lock()
+
+    def shingles(self,text:str)->set:
+        words=re.sub(r"\d+","0",text.lower()).split()
+        if len(words)<=self.shingle_size:
+            return {hash(" ".join(words))}
+        return {hash(" ".join(words[i:i+self.shingle_size])) for i in range(len(words)-self.shingle_size+1)}
+
+    def is_boilerplate(self,host:str,page:str,text:str)->bool:
+        """True when most of the block's shingles appeared on a different page of host"""
+        seen=self.hosts.get(host)
+        if not seen:
+            return False
+        shingles=self.shingles(text)
+        repeated=sum(1 for shingle in shingles if seen.get(shingle,page)!=page)
+        return repeated>=self.threshold*len(shingles)
+
+    def add(self,host:str,page:str,texts:List[str]):
+        """Remember the blocks of one page"""
+        with self._lock:
+            seen=self.hosts.pop(host,None) or {}
+            self.hosts[host]=seen
+            while len(self.hosts)>self.max_hosts:
+                self.hosts.popitem(last=False)
+            for text in texts:
+                for shingle in self.shingles(text):
+                    seen.setdefault(shingle,page)
+            if len(seen)>self.max_shingles:
+                for shingle in list(seen)[:len(seen)-self.max_shingles]:
+                    del seen[shingle]
+
+
+def page_key(url:str)->tuple:
+    """(host,page) for the index; scheme, www., query, fragment and trailing slash are ignored"""
+    parts=urlsplit(url)
+    host=parts.netloc.lower()
+    if host.startswith("www."):
+        host=host[4:]
+    return host,host+(parts.path.rstrip("/") or "/")
+
+
+def extract_main_text(soup,max_chars:int=2000,index:Optional[BoilerplateIndex]=None,url:str="",min_chars:int=200)->str:
+    """Most informative max_chars of a page, in document order.
+
+    Blocks are scored by text and link density; with an index, blocks
+    already seen on other pages of the same host are dropped first. When
+    the scored blocks give fewer than min_chars, every block is returned.
+    """
+    blocks=text_blocks(soup)
+    host,page=page_key(url)
+    if index is not None:
+        fresh=[block for block in blocks if not index.is_boilerplate(host,page,block["text"])]
+        index.add(host,page,[block["text"] for block in blocks])
+        # Never trade the whole page for an empty answer
+        if any(score_block(block)>0 for block in fresh):
+            blocks=fresh
+
+    ranked=sorted(
+        ((score_block(block),position) for position,block in enumerate(blocks)),
+        key=lambda item:-item[0]
+    )
+    chosen=[]
+    used=0
+    for score,position in ranked:
+        if score<=0 or used>=max_chars:
+            break
+        chosen.append(position)
+        used+=len(blocks[position]["text"])+1
+    text="\n".join(blocks[position]["text"] for position in sorted(chosen))
+    # Short pages and link lists have no article-like block; keep everything in order
+    if len(text)<min_chars:
+        text="\n".join(block["text"] for block in blocks)
+    return text[:max_chars]
+
 
 class webscraperTool(Tool):
-    def __init__(self):
-        super().__init__("scrape_website","scrapes contents from available website url")
+    def __init__(self,max_chars:int=2000,boilerplate_index:Optional[BoilerplateIndex]=None):
+        super().__init__("scrape_website","scrapes contents from available website url",
+                         intents=[r"scrape\s+(?P<url>\S+\.\S+)"],
+                         keywords=["scrape"],
+                         result_fields=["error","url","title","content"])
+        self.max_chars=max_chars
+        self.boilerplate_index=boilerplate_index or BoilerplateIndex()
 
     def execute(self,url:str)->dict:
+        if not url.startswith('http'):
+            url='https://' + url
         try:
             print(f"\nScraping:{url}")
             headers={'User-Agent':'Mozilla/5.0(Windows NT 10.0; Win64;x64)AppleWebKit/537.36'}
-            response=requests.get(url,headers=headers,timeout=10)
+            response=http_session.get(url,headers=headers,timeout=10)
             response.raise_for_status()
 
             soup=BeautifulSoup(response.content,'html.parser')
-            for script in soup(["script","style"]):
-                script.decompose()
-
-            text=soup.get_text()
-            lines=(line.strip() for line in text.splitlines())
-            chunks=(phrase.strip() for line in lines for phrase in line.split(" "))
-            text=''.join(chunk for chunk in chunks if chunk)
-            text=text[:2000]
+            title=soup.title.get_text(strip=True) if soup.title else "No title"
+            text=extract_main_text(soup,self.max_chars,self.boilerplate_index,response.url or url)
             print(f"Scrapped {len(text)} characters.")
-            return {"url":url,"title":soup.title.string if soup.title else "No title","content":text,"status":"success"}
+            return {"url":url,"title":title or "No title","content":text,"status":"success"}
         
         except Exception as e:
             print(f"Error:{e}")
@@ -33,7 +572,10 @@ class webscraperTool(Tool):
         
 class GoogleSearchTool(Tool):
     def __init__(self):
-        super().__init__("google_search","searches google and returns top results")
+        super().__init__("google_search","searches google and returns top results",
+                         intents=[(r"(?:search|google)(?:\s+for)?\s+(?P<query>[^?]+)\??",0.95,8)],
+                         keywords=["search","google"],
+                         result_fields=["error","title","link","snippet"])
 
     def execute(self,query:str,num_results:int=5)->list:
         try:
@@ -48,47 +590,12 @@ class GoogleSearchTool(Tool):
                 'Connection':'keep=alive',
                 'Upgrade-Insecure-Requests':'1'
             }
-            response=requests.get(url,headers=headers,timeout=10)
+            response=http_session.get(url,headers=headers,timeout=10)
             response.raise_for_status()
             soup=BeautifulSoup(response.content,'html.parser')
-            results=[]
-            search_results=soup.find_all('div',class_='g')
-            if not search_results:
-                search_results=soup.find_all('div',{'data-sokoban-container':True})
-            if not search_results:
-                search_results=soup.find_all('div',class_='tF2Cxc')
-            for g in search_results[:num_results]:
-                try:
-                    title_elem=g.find('h3')
-                    if not title_elem:
-                        continue
-                    title=title_elem.get_text()
-                    link_elem=g.find('a')
-                    if not link_elem or 'href' not in link_elem.attrs:
-                        continue
-                    link=link_elem['href']
-
-                    snippet=""
-                    snippet_elem=g.find('div',class_='VwiC3b')
-                    if not snippet_elem:
-                        snippet_elem=g.find('span',class_='aCOpRe')
-                    if not snippet_elem:
-                        snippet_elem=g.find('div',class_='s')
-                    if snippet_elem:
-                        snippet=snippet_elem.get_text()
-                    if snippet_elem:
-                        snippet=snippet_elem.get_text()
-                    if title and link:
-                        results.append(
-                            {
-                                "title":title,
-                                "link":link,
-                                "snippet":snippet or "No description available"
-                            }
-                        )
-                except Exception as e:
-                    print(f"Skipping result due to:{e}")
-                    continue
+            results=GOOGLE_RESULT_RULES.extract(soup,num_results)
+            for result in results:
+                result.setdefault("snippet","No description available")
             if len(results)==0:
                 print("No results found.Google may be blocking requests.")
                 return [
@@ -113,8 +620,12 @@ class GoogleSearchTool(Tool):
             
         
 class wikipediaTool(Tool):
-    def __init__(self):
-        super().__init__("wikipedia","Gets information from wikipedia")
+    def __init__(self,http_cache:Optional[HttpCache]=None):
+        super().__init__("wikipedia","Gets information from wikipedia",
+                         intents=[(r"wiki(?:pedia)?\s+(?P<topic>[^?]+)\??",0.95,6)],
+                         keywords=["wiki","wikipedia"],
+                         result_fields=["error","suggestions","title","summary","url"])
+        self.http_cache=http_cache
 
     def execute(self,topic:str)->dict:
         try:
@@ -123,7 +634,7 @@ class wikipediaTool(Tool):
             headers={
                 'User-Agent':'ResearchAgent/1.0(Educational Purpose)'
             }
-            response=requests.get(url,headers=headers,timeout=10)
+            response=(self.http_cache or get_http_cache()).get(url,headers=headers,timeout=10)
             if response.status_code==404:
                 return{
                     'error':f"Article not found for '{topic}'",
@@ -172,44 +683,30 @@ class wikipediaTool(Tool):
         
 
 class NewsScrapperTool(Tool):
-    def __init__(self):
-        super().__init__("gets_news","Gets latest news headlines.")
+    def __init__(self,http_cache:Optional[HttpCache]=None):
+        super().__init__("gets_news","Gets latest news headlines.",
+                         intents=[r"(?:latest\s+)?(?:news|headlines)(?:\s+(?:on|about|for))?\s+(?P<topic>[^?]+)\??",
+                                  r"(?:latest|recent)\s+(?P<topic>[^?]+?)\s+(?:news|headlines)\??"],
+                         keywords=["news","headlines"],
+                         result_fields=["error","title","link","note"])
+        self.http_cache=http_cache
 
     def execute(self,topic:str="technology")->list:
         try:
             print(f"\n Fetching news:{topic}")
             url=f"https://www.google.com/search?q={quote_plus(topic)}"
             headers={'User-Agent':'Mozilla/5.0(Windows NT 10.0; Win64;x64)AppleWebKit/537.36(KHTML,like Gecko)Chrome/91.0.4472.124 Safari/537.36'}
-            response=requests.get(url,headers=headers,timeout=10)
+            response=(self.http_cache or get_http_cache()).get(url,headers=headers,timeout=10)
             response.raise_for_status()
             soup=BeautifulSoup(response.content,'html.parser')
 
-            articles=[]
-            for article in soup.find_all('article')[:10]:
-                try:
-                    title_element=article.find('a')
-                    if title_element and title_element.get_text(strip=True):
-                        href=title_element.get('href','')
-                        if href.startswith('./'):
-                            href='https://news.google.com' + href[1:]
-                        elif not href.startswith('http'):
-                            href='https://news.google.com' + href
-                        articles.append(
-                            {
-                                "title":title_element.get_text(strip=True),
-                                "link":href
-                            }
-                        )
-                except Exception as e:
-                    continue
-            if len(articles)==0:
-                for link in soup.find_all('a',href=True)[:15]:
-                    try:
-                        text=link.get_text(strip=True)
-                        if len(text) >20 and './articles/' in link['href']:
-                            href='https://news.google.com' + link['href'][1:]
-                    except:
-                        continue
+            articles=NEWS_ARTICLE_RULES.extract(soup,10)
+            for article in articles:
+                href=article["link"]
+                if href.startswith('./'):
+                    article["link"]='https://news.google.com' + href[1:]
+                elif not href.startswith('http'):
+                    article["link"]='https://news.google.com' + href
             if len(articles)==0:
                 return{
                     'title':f"News search for '{topic}'",
@@ -229,35 +726,181 @@ class NewsScrapperTool(Tool):
             ]
                             
         
+# Spellings of the same country, so 'London, United Kingdom' and 'London, UK' share a key
+COUNTRY_NAMES={
+    "united kingdom":"uk","great britain":"uk","gb":"uk",
+    "united states":"us","united states of america":"us","usa":"us",
+}
+# Qualified names that wttr.in resolves to the same place as the bare name.
+# Only add an entry when the bare name really is that city: 'london, ca' or
+# 'perth, uk' must keep their country or they would be served the wrong weather.
+CITY_ALIASES={
+    "london, uk":"london","london, england":"london",
+    "paris, france":"paris","lagos, nigeria":"lagos","tokyo, japan":"tokyo",
+    "berlin, germany":"berlin","madrid, spain":"madrid","rome, italy":"rome",
+    "new york, us":"new york","new york, ny":"new york","new york city":"new york",
+}
+
+def normalize_city(city:str)->str:
+    """Cache key for a city: only case, whitespace and known aliases are folded; the country is kept"""
+    parts=[" ".join(part.split()).lower().strip(".") for part in city.split(",")]
+    parts=[part for part in parts if part]
+    if len(parts)>1:
+        parts[-1]=COUNTRY_NAMES.get(parts[-1],parts[-1])
+    key=", ".join(parts)
+    return CITY_ALIASES.get(key,key)
+
+
+def read_current_condition(response:requests.Response)->dict:
+    """Reads the j1 stream only until current_condition is complete"""
+    decoder=json.JSONDecoder()
+    buffer=""
+    for chunk in response.iter_content(chunk_size=4096,decode_unicode=True):
+        buffer+=chunk if isinstance(chunk,str) else chunk.decode("utf-8","replace")
+        start=buffer.find('"current_condition"')
+        if start==-1:
+            continue
+        start=buffer.find("[",start)
+        if start==-1:
+            continue
+        try:
+            current,_=decoder.raw_decode(buffer,start)
+            return current[0]
+        except ValueError:
+            continue
+    return json.loads(buffer)['current_condition'][0]
+
+
+CITY=r"(?P<city>[a-z][a-z .,'-]*?)"
+
+
 class WeatherTool(Tool):
-    def __init__(self):
-        super().__init__("get_weather","Gets current weather for any city")
+    def __init__(self,observation_interval:int=1800,min_ttl:int=60,max_workers:int=8,base_url:str="https://wttr.in"):
+        super().__init__("get_weather","Gets current weather for any city",
+                         intents=[r"weather\s+(?:in\s+|for\s+)?"+CITY+r"(?:\s+(?:today|right\s+now|now))?\??",
+                                  r"what(?:'s|\s+is)\s+the\s+(?:weather|temperature)\s+(?:like\s+)?in\s+"+CITY+r"(?:\s+(?:today|right\s+now|now))?\??"],
+                         keywords=["weather","temperature"],
+                         result_fields=["error","city","temperature_c","temperature_f","condition","humidity","wind_speed_Kmph","feels_like_c","feels_like_f"])
+        self.base_url=base_url
+        self.observation_interval=observation_interval
+        self.min_ttl=min_ttl
+        self.max_workers=max_workers
+        self.session=http_session
+        self.cache:Dict[str,tuple]={}
+        self._lock=threading.Lock()
 
-    def execute(self,city:str)->dict:
+    def _expires_at(self,current:dict)->float:
+        """Next time the observation can change: observation_time (UTC) + interval"""
+        now=time.time()
         try:
-            print(f"Fetching weather:{city}")
-            url=f"https://wttr.in/{quote_plus(city)}?format=j1"
-            response=requests.get(url,timeout=10)
-            data=response.json()
-            current=data['current_condition'][0]
+            observed=datetime.strptime(current['observation_time'],"%I:%M %p").time()
+            today=datetime.now(timezone.utc)
+            observed_at=datetime.combine(today.date(),observed,tzinfo=timezone.utc)
+            if observed_at>today:
+                observed_at-=timedelta(days=1)
+            expires=observed_at.timestamp()+self.observation_interval
+        except (KeyError,ValueError):
+            expires=now
+        return max(expires,now+self.min_ttl)
 
-            result={
-                "city":city,
-                "temperature_c":current['temp_C'],
-                "temperature_f":current['temp_F'],
-                "condition":current['weatherDesc'][0]['value'],
-                "humidity":current['humidity'],
-                "wind_speed_Kmph":current['windspeedKmph'],
-                "feels_like_c":current['FeelsLikeC'],
-                "feels_like_f":current['FeelsLikeF']
+    def _fetch(self,key:str)->dict:
+        url=f"{self.base_url}/{quote_plus(key)}?format=j1"
+        with self.session.get(url,timeout=10,stream=True) as response:
+            response.encoding=response.encoding or "utf-8"
+            current=read_current_condition(response)
 
-            }
+        result={
+            "temperature_c":current['temp_C'],
+            "temperature_f":current['temp_F'],
+            "condition":current['weatherDesc'][0]['value'],
+            "humidity":current['humidity'],
+            "wind_speed_Kmph":current['windspeedKmph'],
+            "feels_like_c":current['FeelsLikeC'],
+            "feels_like_f":current['FeelsLikeF'],
+            "observation_time":current.get('observation_time')
+        }
+        with self._lock:
+            self.cache[key]=(self._expires_at(current),result)
+        return result
+
+    def execute(self,city:str)->dict:
+        try:
+            key=normalize_city(city)
+            cached=self.cache.get(key)
+            if cached and cached[0]>time.time():
+                result=cached[1]
+                print(f"Weather cache hit:{city}")
+            else:
+                print(f"Fetching weather:{city}")
+                result=self._fetch(key)
+            result=dict(result,city=city)
             print(f"{city}:{result['temperature_c']}c,{result['condition']}")
             return result
         except Exception as e:
             print(f"Error:{e}")
             return {"error":str(e),"city":city}
 
+    def execute_many(self,cities:List[str])->List[dict]:
+        """Fetches several cities concurrently; duplicates after normalization are fetched once"""
+        unique={}
+        for city in cities:
+            unique.setdefault(normalize_city(city),city)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers,len(unique) or 1)) as pool:
+            results=dict(zip(unique,pool.map(self.execute,unique.values())))
+        return [dict(results[normalize_city(city)],city=city) for city in cities]
+
+def print_weather(data,params):
+    print(f"\n Weather in {data.get('city')}")
+    print(f" Temperature:{data.get('temperature_c')}C({data.get('temperature_f')}F)")
+    print(f" Condition:{data.get('condition')}")
+    print(f" Humidity: {data.get('humidity')}")
+    print(f" Wind Speed:{data.get('wind_speed_kmph')}km/h")
+    print(f" Feels like :{data.get('feels_like_c')}C ({data.get('feels_like_f')}F)")
+
+def print_wikipedia(data,params):
+    if data.get("status")=="success":
+        print(f"\n Wikipedia:{data.get('title')}")
+        print(f"\n {data.get('summary')}")
+        print(f"\n Read more: {data.get('url')}")
+    else:
+        print(f"\n {data.get('error')}")
+
+def print_search(data,params):
+    print(f"\n Search Results for :{params['query']}\n")
+    for i,item in enumerate(data,1):
+        if "error" in item:
+            print(f"Error:{item['error']}")
+        else:
+            print(f"{i}.{item.get('title')}")
+            print(f" {item.get('snippet')}")
+            print(f" {item.get('link')}")
+            print()
+
+def print_news(data,params):
+    print(f"\n Latest News: {params['topic']}\n")
+    for i,article in enumerate(data,1):
+        if "error" in article:
+            print(f"Error:{article['error']}")
+        else:
+            print(f"{i}. {article.get('title')}")
+            print(f" {article.get('link')}")
+            print()
+
+def print_scrape(data,params):
+    if data.get("status")=="success":
+        print(f"\n Scraped: {data.get('url')}")
+        print(f" Title: {data.get('title')}")
+        print(f"\n Content Preview:")
+        print(data.get('content')[:500]+ "...")
+    else:
+        print(f"\n Error:{data.get('error')}")
+
+# Shortcut inputs ("weather in Tokyo", "wiki Bitcoin", ...) are matched by the agent's
+# IntentRouter, so the REPL and Agent.run() share one set of patterns
+RESULT_PRINTERS={"get_weather":print_weather,"wikipedia":print_wikipedia,"google_search":print_search,
+                 "gets_news":print_news,"scrape_website":print_scrape}
+
+
 if __name__=="__main__":
     print("\n" + "="*60)
     print("WEB PULL AGENT")
@@ -328,113 +971,31 @@ if __name__=="__main__":
             print(f"Tools:{','.join(status['tools'])}")
             print(f"Errors:{status['errors']['total_errors']}")
             print(f"Approvals:{status['approvals']}")
+            if status['router']:
+                router=status['router']
+                print(f"Routed without LLM:{router['routed']}/{router['requests']} ({router['routed_share']*100:.0f}%), ~{router['estimated_seconds_saved']:.1f}s saved")
             print()
             continue
          elif user_input.lower()=="clear":
             research_agent.memory.clear_short_term()
             print("\n Conversation memory cleared!\n")
             continue
-         elif user_input.lower().startswith('weather'):
-            city=user_input[8:].strip()
-            if city:
-                result=research_agent.execute_tool("get_weather",city=city)
-                if result.get("success"):
-                    data=result.get("result")
-                    print(f"\n Weather in {data.get('city')}")
-                    print(f" Temperature:{data.get('temperature_c')}C({data.get("temperature_f")}F)")
-                    print(f" Condition:{data.get('condition')}")
-                    print(f" Humidity: {data.get('humidity')}")
-                    print(f" Wind Speed:{data.get('wind_speed_kmph')}km/h")
-                    print(f" Feels like :{data.get('feels_like_c')}C ({data.get('feels_like_f')}F)")
-                else:
-                    print(f"\n Error: {result.get('error')}")
-                print()
-            else:
-                print("\n Please specify a city. Example:weather  London\n")
-            continue
-         elif user_input.lower().startswith("wiki"):
-            topic=user_input[5:].strip()
-            if topic:
-                result=research_agent.execute_tool("wikipedia",topic=topic)
-                if result.get("success"):
-                    data=result.get("result")
-                    if data.get("status")=="success":
-                        print("\n Wikipedia:{data.get('title)}")
-                        print(f"\n {data.get('summary')}")
-                        print(f"\n Read more: {data.get('url')}")
-
-                    else:
-                        print(f"\n {data.get('error')}")
-
-                else:
-                    print(f"\n Error: {result.get('error')}")
-                print()
-            else:
-                print("\n Please specify a topic.Example:wiki Bitcoin\n")
-                continue
-         elif user_input.lower().startswith('search'):
-            query=user_input[7:].strip()
-            if query:
-                result=research_agent.execute_tool("google_search",query=query,num_results=5)
-                if result.get("success"):
-                    data=result.get("result")
-                    print(f"\n Search Results for :{query}\n")
-                    for i,item in enumerate(data,1):
-                        if "error" in item:
-                            print(f"Error:{item['error']}")
-                        else:
-                            print(f"{i}.{item.get('title')}")
-                            print(f" {item.get('snippet')}")
-                            print(f" {item.get('link')}")
-                            print()
-                else:
-                    print(f"\n Error:{result.get('error')}\n")
-            else:
-                print("\n Please speify a search query.Example: search python tutorials\n")
-            continue
-         elif user_input.lower().startswith('news'):
-            topic=user_input[5:].strip()
-            if topic:
-                result=research_agent.execute_tool("get_news",topic=topic)
-                if result.get("success"):
-                    data=result.get("result")
-                    print(f"\n Latest News: {topic}\n")
-                    for i,article in enumerate(data,1):
-                        if "error" in article:
-                            print(f"Error:{article['error']}")
-                        else:
-                            print(f"{i}. {article.get('title')}")
-                            print(f" {article.get('link')}")
-                            print()
-                else:
-                    print(f"\n Error:{result.get('error')}\n")
-            else:
-                print("\n Please specify a topic.Example:news technology\n")
-            continue
-         elif user_input.lower().startswith('scrape'):
-            url=user_input[7:].strip()
-            if url:
-                if not url.startswith('http'):
-                    url='https://' + url
-                result=research_agent.execute_tool("scrape_website",url=url)
-                if result.get("success"):
-                    data=result.get("result")
-                    if data.get("status")=="success":
-                        print(f"\n Scraped: {data.get('url')}")
-                        print(f" Title: {data.get('title')}")
-                        print(f"\n Content Preview:")
-                        print(data.get('content')[:500]+ "...")
-                    else:
-                        print(f"\n Error:{data.get('error')}")
-                else:
-                    print(f"\n Error:{result.get('error')}")
-                print()
+         route=research_agent.router.match(user_input)
+         if route:
+            research_agent.router.record_hit()
+            tool_name=route["tool"]
+            params=dict(route["params"])
+            if tool_name=="google_search":
+                params["num_results"]=5
+            result=research_agent.execute_tool(tool_name,**params)
+            if result.get("success"):
+                RESULT_PRINTERS[tool_name](result.get("result"),params)
             else:
-                print("\n Please specify a URL.Example: scrape example.com\n")
+                print(f"\n Error: {result.get('error')}")
+            print()
             continue
-         else:
-            response=research_agent.run(user_input)
-            print(f"\n Assistant:{response}\n")
+         response=research_agent.run(user_input)
+         print(f"\n Assistant:{response}\n")
         except KeyboardInterrupt:
             print("\n\n Interrupted by user")
             break
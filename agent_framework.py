@@ -1,24 +1,635 @@
-from typing import Optional, Dict, Any, List, Callable
-from pydantic import BaseModel, ValidationError
+from typing import Optional, Dict, Any, List, Callable, Iterator
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from collections.abc import Mapping
+from pydantic import BaseModel, TypeAdapter, ValidationError
 import json
+import asyncio
+import atexit
+import cProfile
+import glob
+import gzip
+import hashlib
 import logging
+import mmap
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+import tracemalloc
+import uuid
+from contextvars import ContextVar, copy_context
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
 
 
+# COMPACT RECORDS
+
+class Record(Mapping):
+    """Slotted log entry that stores an epoch float and reads like a dict"""
+
+    __slots__ = ("created",)
+    _fields: tuple = ()
+
+    def __init__(self, created: Optional[float] = None):
+        self.created = time.time() if created is None else created
+
+    @property
+    def timestamp(self) -> str:
+        """ISO timestamp, formatted only when asked for"""
+        return datetime.fromtimestamp(self.created).isoformat()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy, e.g. for json.dumps"""
+        return {key: getattr(self, key) for key in self._fields}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Interaction(Record):
+    """One user/agent exchange stored in Memory"""
+
+    __slots__ = ("user_input", "agent_response", "_metadata")
+    _fields = ("timestamp", "user_input", "agent_response", "metadata")
+
+    def __init__(self, user_input: str, agent_response: str, metadata: Optional[Dict] = None, created: Optional[float] = None):
+        super().__init__(created)
+        self.user_input = user_input
+        self.agent_response = agent_response
+        self._metadata = metadata or None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+
+class ErrorRecord(Record):
+    """One failed attempt logged by Recovery"""
+
+    __slots__ = ("function", "attempt", "error")
+    _fields = ("timestamp", "function", "attempt", "error")
+
+    def __init__(self, function: str, attempt: int, error: str, created: Optional[float] = None):
+        super().__init__(created)
+        self.function = function
+        self.attempt = attempt
+        self.error = error
+
+
+def preview(value: Any, max_chars: int = 200) -> str:
+    """Short JSON preview of a value for in-memory logs"""
+    text = json.dumps(value, default=str)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+class ApprovalRecord(Record):
+    """One approval decision logged by FeedbackControl; details is a bounded preview"""
+
+    __slots__ = ("action", "details", "confidence", "approved", "decided_by")
+    _fields = ("timestamp", "action", "details", "confidence", "approved", "decided_by")
+
+    def __init__(self, action: str, details: Dict[str, Any], confidence: float, approved: bool, decided_by: str = "human", created: Optional[float] = None):
+        super().__init__(created)
+        self.action = action
+        self.details = preview(details)
+        self.confidence = confidence
+        self.approved = approved
+        self.decided_by = decided_by
+
+
+
+
+# BOUNDED LOGS
+
+class JsonlLogStore:
+    """Append-only JSONL files, rotated to path.1, path.2, ... past max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _rotated(self) -> List[str]:
+        paths = glob.glob(glob.escape(self.path) + ".*")
+        numbered = [p for p in paths if p.rsplit(".", 1)[-1].isdigit()]
+        return sorted(numbered, key=lambda p: int(p.rsplit(".", 1)[-1]))
+
+    def write(self, entries: List[Dict[str, Any]]):
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            rotated = self._rotated()
+            next_index = int(rotated[-1].rsplit(".", 1)[-1]) + 1 if rotated else 1
+            os.replace(self.path, f"{self.path}.{next_index}")
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = []
+        for path in self._rotated() + [self.path]:
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if since is not None and entry["created"] < since:
+                        continue
+                    if until is not None and entry["created"] >= until:
+                        continue
+                    if where and any(entry.get(key) != value for key, value in where.items()):
+                        continue
+                    results.append(entry)
+        return results[-limit:] if limit else results
+
+    def close(self):
+        pass
+
+
+class SqliteLogStore:
+    """Append-only SQLite table of JSON entries"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS log (id INTEGER PRIMARY KEY, created REAL, data TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS log_created ON log (created)")
+        self.conn.commit()
+        self._lock = threading.Lock()
+
+    def write(self, entries: List[Dict[str, Any]]):
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO log (created, data) VALUES (?, ?)",
+                [(entry["created"], json.dumps(entry, default=str)) for entry in entries]
+            )
+            self.conn.commit()
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        clauses, args = [], []
+        if since is not None:
+            clauses.append("created >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("created < ?")
+            args.append(until)
+        for key, value in (where or {}).items():
+            clauses.append("json_extract(data, ?) = ?")
+            args.extend([f"$.{key}", value])
+        sql = "SELECT data FROM log"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self.conn.execute(sql, args).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def open_log_store(path: str):
+    """SQLite for .db/.sqlite paths, JSONL otherwise"""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteLogStore(path)
+    return JsonlLogStore(path)
+
+
+class BoundedLog:
+    """Ring buffer of recent records with O(1) aggregates and optional disk history.
+
+    Only the last max_entries records stay in memory. When a store is given,
+    every record is also handed to a background thread that appends it to
+    disk, and query() searches that full history. Pending records are
+    flushed at interpreter exit.
+    """
+
+    def __init__(self, max_entries: int = 1000, key: Optional[Callable[[Record], str]] = None, store: Any = None):
+        self.recent: deque = deque(maxlen=max_entries)
+        self.key = key
+        self.total = 0
+        self.counts: Counter = Counter()
+        self.store = open_log_store(store) if isinstance(store, str) else store
+        self._lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._closed = False
+        if self.store is not None:
+            self._queue = queue.Queue()
+            threading.Thread(target=self._writer, daemon=True).start()
+            atexit.register(self.close)
+
+    def append(self, record: Record, disk_fields: Optional[Dict[str, Any]] = None):
+        """Add a record; disk_fields replace fields in the on-disk copy only"""
+        with self._lock:
+            self.recent.append(record)
+            self.total += 1
+            if self.key:
+                self.counts[self.key(record)] += 1
+        if self._queue is not None:
+            self._queue.put((record, disk_fields))
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.store.write([{"created": record.created, **record.to_dict(), **(fields or {})} for record, fields in batch])
+            except Exception as e:
+                print(f" Could not write log batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Wait until every appended record is on disk"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search the on-disk history (or the in-memory records when there is no store)"""
+        if self.store is None:
+            results = [
+                {"created": record.created, **record.to_dict()} for record in self.recent
+                if (since is None or record.created >= since)
+                and (until is None or record.created < until)
+                and all(record.get(k) == v for k, v in (where or {}).items())
+            ]
+            return results[-limit:] if limit else results
+        self.flush()
+        return self.store.query(since=since, until=until, where=where, limit=limit)
+
+    def close(self):
+        """Flush pending records and close the store"""
+        if self.store is None or self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.flush()
+        self.store.close()
+
+    def __len__(self) -> int:
+        return len(self.recent)
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self.recent)[index]
+        return self.recent[index]
+
+    def tail(self, n: int) -> List[Record]:
+        """Last n records without copying the whole buffer"""
+        n = min(n, len(self.recent))
+        return list(islice(reversed(self.recent), n))[::-1]
+
+
+# LIFECYCLE HOOKS
+
+class HookBus:
+    """Named extension points inside Agent.run
+
+    Handlers are called as handler(**payload) and always receive
+    request_id. Emitting an event nobody listens to is a dict lookup.
+    """
+
+    EVENTS = ("before_run", "after_run", "before_llm", "after_llm", "before_tool", "after_tool", "on_retry", "on_memory_write")
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Callable]] = {}
+        self.current_request: ContextVar[Optional[str]] = ContextVar("current_request", default=None)
+        self.logger = logging.getLogger("Agent.hooks")
+
+    def register(self, event: str, handler: Callable):
+        """Call handler on every emit of event"""
+        if event not in self.EVENTS:
+            raise ValueError(f"Unknown hook event '{event}'. Expected one of {', '.join(self.EVENTS)}")
+        self.handlers.setdefault(event, []).append(handler)
+
+    def unregister(self, event: str, handler: Callable):
+        handlers = self.handlers.get(event, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self.handlers.pop(event, None)
+
+    def add(self, hook: Any):
+        """Register every method of hook named after an event"""
+        for event in self.EVENTS:
+            handler = getattr(hook, event, None)
+            if callable(handler):
+                self.register(event, handler)
+
+    def emit(self, event: str, **payload):
+        handlers = self.handlers.get(event)
+        if not handlers:
+            return
+        payload.setdefault("request_id", self.current_request.get())
+        for handler in handlers:
+            try:
+                handler(**payload)
+            except Exception as e:
+                self.logger.warning("Hook %s for %s failed: %s", getattr(handler, "__qualname__", handler), event, e)
+
+
+class ProfilingHook:
+    """Profiles a sample of requests and writes one set of artifacts per request
+
+    For each sampled request it writes <request_id>.prof (cProfile, open with
+    pstats or snakeviz), <request_id>.memory.txt (top tracemalloc allocations)
+    and <request_id>.json (LLM/tool/retry timeline).
+    """
+
+    def __init__(self, output_dir: str = "profiles", sample_rate: float = 0.01, cprofile: bool = True, memory: bool = False, top_n: int = 25):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.cprofile = cprofile
+        self.memory = memory
+        self.top_n = top_n
+        self.active: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._tracing = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    def before_run(self, request_id: str, user_input: str = "", **_):
+        if random.random() >= self.sample_rate:
+            return
+        sample = {"started": time.perf_counter(), "user_input": user_input, "events": []}
+        if self.cprofile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                sample["profiler"] = profiler
+            except ValueError:
+                # Another profiler is already running on this interpreter
+                pass
+        if self.memory:
+            with self._lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                self._tracing += 1
+            sample["snapshot"] = tracemalloc.take_snapshot()
+        self.active[request_id] = sample
+
+    def _event(self, name: str, request_id: Optional[str], **fields):
+        sample = self.active.get(request_id)
+        if sample is not None:
+            sample["events"].append({"event": name, "at": round(time.perf_counter() - sample["started"], 6), **fields})
+
+    def after_llm(self, request_id: Optional[str] = None, seconds: float = 0.0, **_):
+        self._event("llm", request_id, seconds=round(seconds, 6))
+
+    def after_tool(self, request_id: Optional[str] = None, tool_name: str = "", seconds: float = 0.0, **_):
+        self._event("tool", request_id, tool=tool_name, seconds=round(seconds, 6))
+
+    def on_retry(self, request_id: Optional[str] = None, function: str = "", attempt: int = 0, error: str = "", **_):
+        self._event("retry", request_id, function=function, attempt=attempt, error=error)
+
+    def after_run(self, request_id: str, **_):
+        sample = self.active.pop(request_id, None)
+        if sample is None:
+            return
+        base = os.path.join(self.output_dir, request_id)
+
+        profiler = sample.get("profiler")
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")
+
+        if "snapshot" in sample:
+            stats = tracemalloc.take_snapshot().compare_to(sample["snapshot"], "lineno")
+            with open(base + ".memory.txt", "w") as f:
+                for stat in stats[:self.top_n]:
+                    f.write(f"{stat}\n")
+            with self._lock:
+                self._tracing -= 1
+                if self._tracing == 0:
+                    tracemalloc.stop()
+
+        with open(base + ".json", "w") as f:
+            json.dump({
+                "request_id": request_id,
+                "user_input": sample["user_input"],
+                "seconds": round(time.perf_counter() - sample["started"], 6),
+                "events": sample["events"]
+            }, f, indent=2)
+
+
+# RECORD / REPLAY
+
+class Cassette:
+    """Recorded LLM and HTTP exchanges, replayed without network access
+
+    mode "record" captures every exchange, "replay" serves only recorded
+    ones (a miss raises ValueError) and "auto" replays what it has and
+    records the rest. The file format follows the extension: .jsonl,
+    .jsonl.gz, .jsonl.zst (needs zstandard) or .msgpack (needs msgpack).
+    JSONL cassettes are memory-mapped and only the key index is built on
+    load; an entry is parsed when it is first served.
+
+    replay_latency: False serves instantly, True sleeps the recorded
+    latency, a float scales it.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", replay_latency: Any = False):
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError(f"Unknown cassette mode '{mode}'")
+        if path.endswith(".msgpack") and msgpack is None:
+            raise ValueError("msgpack cassettes need the msgpack package")
+        if path.endswith(".zst") and zstandard is None:
+            raise ValueError("zstd cassettes need the zstandard package")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.index: Dict[str, List[Any]] = {}
+        self.cursors: Counter = Counter()
+        self.recorded: List[tuple] = []
+        self.stats = {"replayed": 0, "recorded": 0, "missed": 0}
+        self._data: Any = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        if mode != "record":
+            self._load()
+
+    @staticmethod
+    def llm_key(model: str, messages: List[Dict[str, str]], **options) -> str:
+        """Key for a completion: whitespace-normalised messages plus model and options"""
+        normalised = [{"role": m["role"], "content": " ".join(str(m["content"]).split())} for m in messages]
+        payload = json.dumps({"model": model, "messages": normalised, **options}, sort_keys=True, default=str)
+        return "llm:" + hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _load(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.path.endswith(".msgpack"):
+            for key, entry in msgpack.Unpacker(self._mmap, raw=False):
+                self.index.setdefault(key, []).append(entry)
+            return
+
+        if self.path.endswith(".gz"):
+            data = gzip.decompress(self._mmap)
+        elif self.path.endswith(".zst"):
+            data = zstandard.ZstdDecompressor().stream_reader(self._mmap).read()
+        else:
+            data = self._mmap
+
+        position = 0
+        while True:
+            end = data.find(b"\n", position)
+            if end == -1:
+                break
+            tab = data.find(b"\t", position, end)
+            key = bytes(data[position:tab]).decode("utf-8")
+            self.index.setdefault(key, []).append((tab + 1, end))
+            position = end + 1
+        self._data = data
+
+    def _entry(self, value: Any) -> Dict[str, Any]:
+        if isinstance(value, tuple):
+            start, end = value
+            return json.loads(self._data[start:end])
+        return value
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Next recorded entry for key (repeats of a key are served in order, then the last one again)"""
+        if self.mode == "record":
+            return None
+        with self._lock:
+            entries = self.index.get(key)
+            if not entries:
+                self.stats["missed"] += 1
+                if self.mode == "replay":
+                    raise ValueError(f"No recorded response for {key} in {self.path}")
+                return None
+            position = min(self.cursors[key], len(entries) - 1)
+            self.cursors[key] += 1
+            entry = self._entry(entries[position])
+            entries[position] = entry
+            self.stats["replayed"] += 1
+
+        if self.replay_latency:
+            factor = 1.0 if self.replay_latency is True else float(self.replay_latency)
+            time.sleep(entry.get("latency", 0.0) * factor)
+        return entry
+
+    def record(self, key: str, response: Any, latency: float, kind: str = ""):
+        """Store a live exchange"""
+        entry = {"kind": kind or key.split(":", 1)[0], "latency": round(latency, 4), "response": response}
+        with self._lock:
+            self.recorded.append((key, entry))
+            self.index.setdefault(key, []).append(entry)
+            self.stats["recorded"] += 1
+
+    def call(self, key: str, live: Callable[[], Any], kind: str = "") -> Any:
+        """Replay key if recorded, otherwise run live() and record its result"""
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry["response"]
+        started = time.perf_counter()
+        response = live()
+        self.record(key, response, time.perf_counter() - started, kind)
+        return response
+
+    def save(self):
+        """Write the cassette; in auto mode earlier recordings are kept"""
+        if not self.recorded:
+            return
+        with self._lock:
+            entries = []
+            if self.mode == "auto":
+                recorded_keys = {id(entry) for _, entry in self.recorded}
+                for key, values in self.index.items():
+                    entries.extend((key, self._entry(value)) for value in values if id(value) not in recorded_keys)
+            entries.extend(self.recorded)
+
+            if self._mmap is not None:
+                self._data = None
+                self._mmap.close()
+                self._mmap = None
+
+            if self.path.endswith(".msgpack"):
+                payload = b"".join(msgpack.packb([key, entry], use_bin_type=True) for key, entry in entries)
+            else:
+                payload = b"".join(
+                    key.encode("utf-8") + b"\t" + json.dumps(entry, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+                    for key, entry in entries
+                )
+                if self.path.endswith(".gz"):
+                    payload = gzip.compress(payload)
+                elif self.path.endswith(".zst"):
+                    payload = zstandard.ZstdCompressor(level=10).compress(payload)
+
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+            self.recorded = []
+            self.index = {key: [] for key, _ in entries}
+            for key, entry in entries:
+                self.index[key].append(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
 # BUILDING BLOCK 1: INTELLIGENCE
 
 class Intelligence:
     """This handles AI reasoning and makes decision"""
     
-    def __init__(self, model="gpt-4o"):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, model="gpt-4o", cassette: Optional[Cassette] = None):
+        self.cassette = cassette
+        # A pure replay never talks to OpenAI, so it needs no API key
+        self.client = OpenAI(api_key=api_key) if cassette is None or cassette.mode != "replay" else None
         self.model = model
 
     def generate_decision(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7) -> str:
@@ -28,12 +639,17 @@ class Intelligence:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=temperature
-        )
-        return response.choices[0].message.content
+        def complete() -> str:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature
+            )
+            return response.choices[0].message.content
+
+        if self.cassette:
+            return self.cassette.call(Cassette.llm_key(self.model, messages, temperature=temperature), complete)
+        return complete()
 
     def structured_output(self, prompt: str, response_model: type[BaseModel], system_prompt: Optional[str] = None) -> BaseModel:
         """Generate structured output using Pydantic model"""
@@ -42,13 +658,19 @@ class Intelligence:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        response = self.client.beta.chat.completions.parse(
-            model=self.model,
-            messages=messages,
-            response_format=response_model
-        )
+        def parse() -> BaseModel:
+            response = self.client.beta.chat.completions.parse(
+                model=self.model,
+                messages=messages,
+                response_format=response_model
+            )
+            return response.choices[0].message.parsed
 
-        return response.choices[0].message.parsed
+        if self.cassette:
+            key = Cassette.llm_key(self.model, messages, response_format=response_model.__name__)
+            recorded = self.cassette.call(key, lambda: parse().model_dump(mode="json"))
+            return response_model.model_validate(recorded)
+        return parse()
 
 
 
@@ -57,21 +679,19 @@ class Intelligence:
 class Memory:
     """Stores and retrieves conversation history"""
     
-    def __init__(self, max_history: int = 100):
-        self.conversation_history: List[Dict[str, Any]] = []
+    def __init__(self, max_history: int = 100, hooks: Optional[HookBus] = None):
+        self.conversation_history: List[Interaction] = []
         self.long_term_storage: Dict[str, Any] = {}
         self.max_history = max_history
+        self.hooks = hooks
 
     def add_interaction(self, user_input: str, agent_response: str, metadata: Optional[Dict] = None):
         """Store an interaction in memory"""
-        interaction = {
-            "timestamp": datetime.now().isoformat(),
-            "user_input": user_input,
-            "agent_response": agent_response,
-            "metadata": metadata or {}
-        }
+        interaction = Interaction(user_input, agent_response, metadata)
 
         self.conversation_history.append(interaction)
+        if self.hooks:
+            self.hooks.emit("on_memory_write", interaction=interaction)
         
         # Keep only recent conversation history
         if len(self.conversation_history) > self.max_history:
@@ -83,11 +703,16 @@ class Memory:
 
         context_parts = []
         for interaction in history:
-            context_parts.append(f"User: {interaction['user_input']}")
-            context_parts.append(f"Agent: {interaction['agent_response']}")
+            context_parts.append(f"User: {interaction.user_input}")
+            context_parts.append(f"Agent: {interaction.agent_response}")
         
         return "\n".join(context_parts)
 
+    def get_history(self, last_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Recent interactions as plain dicts, e.g. for json.dumps"""
+        history = self.conversation_history[-(last_n or len(self.conversation_history)):]
+        return [interaction.to_dict() for interaction in history]
+
     def store_fact(self, key: str, value: Any):
         """Stores long-term information"""
         self.long_term_storage[key] = value
@@ -115,9 +740,15 @@ class Memory:
 class Tool:
     """Base class for agent tools"""
     
-    def __init__(self, name: str, description: str):
+    def __init__(self, name: str, description: str, intents: Optional[List[Any]] = None, keywords: Optional[List[str]] = None, result_fields: Optional[List[str]] = None):
         self.name = name
         self.description = description
+        # Result fields worth showing the LLM, most valuable first
+        self.result_fields = result_fields
+        # Regexes (or (regex, confidence) pairs) whose named groups become params
+        self.intents = intents or []
+        # Words that must appear in the input before the intents are tried
+        self.keywords = keywords or []
 
     def execute(self, **kwargs) -> Any:
         """Execute the tool - override in subclasses"""
@@ -162,6 +793,207 @@ class ToolRegistry:
         return list(self.tools.keys())
 
 
+def estimate_tokens(text: str) -> int:
+    """Token count via tiktoken when installed, else ~4 characters per token"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+class ResultProjector:
+    """Shrinks a tool result to the fields the tool declares and a token budget"""
+
+    def __init__(self, max_tokens: int = 800, min_field_chars: int = 40):
+        self.max_tokens = max_tokens
+        self.min_field_chars = min_field_chars
+
+    def _select(self, value: Any, fields: Optional[List[str]]) -> Any:
+        if isinstance(value, list):
+            return [self._select(item, fields) for item in value]
+        if isinstance(value, dict):
+            return {key: value[key] for key in (fields or value) if key in value}
+        return value
+
+    def _dumps(self, value: Any) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    def project(self, tool: Optional[Tool], tool_result: Any) -> str:
+        """Compact JSON for the follow-up prompt, within max_tokens"""
+        if isinstance(tool_result, dict) and "success" in tool_result:
+            if not tool_result["success"]:
+                return self._dumps({"error": tool_result.get("error")})
+            tool_result = tool_result.get("result")
+
+        fields = tool.result_fields if tool else None
+        value = self._select(tool_result, fields)
+        text = self._dumps(value)
+        if estimate_tokens(text) <= self.max_tokens:
+            return text
+
+        items = value if isinstance(value, list) else [value]
+        # Trim the lowest-value field of the lowest-ranked item first
+        keys = list(reversed(fields)) if fields else sorted(
+            {key for item in items if isinstance(item, dict) for key in item},
+            key=lambda key: -max(len(str(item.get(key, ""))) for item in items if isinstance(item, dict))
+        )
+        for key in keys:
+            for item in reversed(items):
+                if not isinstance(item, dict) or not isinstance(item.get(key), str):
+                    continue
+                excess = (estimate_tokens(text) - self.max_tokens) * 4
+                if excess <= 0:
+                    return text
+                current = item[key]
+                keep = len(current) - excess
+                # A cut URL is useless, so links are dropped whole
+                if keep < self.min_field_chars or current.startswith(("http://", "https://")):
+                    del item[key]
+                else:
+                    item[key] = current[:keep].rstrip() + "..."
+                text = self._dumps(value)
+
+        while isinstance(value, list) and len(value) > 1 and estimate_tokens(text) > self.max_tokens:
+            value.pop()
+            text = self._dumps(value)
+
+        if estimate_tokens(text) > self.max_tokens:
+            text = text[:self.max_tokens * 4]
+        return text
+
+
+# Words that mean a capture is not a clean entity (a time, a pronoun, a question clause)
+VAGUE_WORDS = {
+    "it", "this", "that", "me", "my", "you", "i", "is", "are", "was", "should", "could", "would",
+    "what", "how", "why", "when", "please", "something", "anything", "today", "tonight",
+    "tomorrow", "yesterday", "week", "weekend", "month", "next", "later", "now"
+}
+
+
+class IntentRule:
+    """A regex that maps user input straight to a tool call
+
+    A match only counts when every capture is short (max_words) and free of
+    VAGUE_WORDS; anything else is left to the LLM.
+    """
+
+    def __init__(self, tool_name: str, pattern: str, confidence: float = 0.95, max_words: int = 4):
+        self.tool_name = tool_name
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.confidence = confidence
+        self.max_words = max_words
+
+    def _is_clean(self, value: str) -> bool:
+        # URLs and domains are single tokens that may contain any word
+        if " " not in value and ("." in value or "/" in value):
+            return True
+        words = re.findall(r"[a-z']+", value.lower())
+        return 0 < len(value.split()) <= self.max_words and not VAGUE_WORDS.intersection(words)
+
+    def match(self, text: str) -> Optional[Dict[str, str]]:
+        """Return the tool params if the rule matches the whole input with clean captures"""
+        match = self.pattern.fullmatch(text)
+        if not match:
+            return None
+        params = {key: value.strip().rstrip("?.!").strip() for key, value in match.groupdict().items() if value}
+        if not params or not all(self._is_clean(value) for value in params.values()):
+            return None
+        return params
+
+
+class IntentRouter:
+    """Dispatches obvious requests to a tool without asking the LLM first"""
+
+    def __init__(self, min_confidence: float = 0.9):
+        self.min_confidence = min_confidence
+        self.rules: List[IntentRule] = []
+        self.keyword_index: Dict[str, List[IntentRule]] = {}
+        self.unindexed_rules: List[IntentRule] = []
+        self.stats = {"requests": 0, "routed": 0, "llm_calls": 0, "llm_seconds": 0.0}
+
+    def add_rule(self, tool_name: str, pattern: str, confidence: float = 0.95, keywords: Optional[List[str]] = None, max_words: int = 4):
+        """Add a routing rule, optionally only tried when one of the keywords is present"""
+        rule = IntentRule(tool_name, pattern, confidence, max_words)
+        self.rules.append(rule)
+        if keywords:
+            for keyword in keywords:
+                self.keyword_index.setdefault(keyword.lower(), []).append(rule)
+        else:
+            self.unindexed_rules.append(rule)
+
+    def index_tool(self, tool: Tool):
+        """Add the intents a tool declares"""
+        for intent in tool.intents:
+            # "pattern", (pattern, confidence) or (pattern, confidence, max_words)
+            options = intent if isinstance(intent, tuple) else (intent,)
+            pattern = options[0]
+            confidence = options[1] if len(options) > 1 else 0.95
+            max_words = options[2] if len(options) > 2 else 4
+            self.add_rule(tool.name, pattern, confidence, tool.keywords, max_words)
+
+    def _candidates(self, text: str) -> List[IntentRule]:
+        words = set(re.findall(r"[a-z]+", text.lower()))
+        candidates = list(self.unindexed_rules)
+        for word in words & self.keyword_index.keys():
+            for rule in self.keyword_index[word]:
+                if rule not in candidates:
+                    candidates.append(rule)
+        return candidates
+
+    def route(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Return {"tool", "params", "confidence"} for a confident match, else None"""
+        best = self.match(user_input)
+        if best:
+            self.record_hit()
+        else:
+            self.stats["requests"] += 1
+        return best
+
+    def record_hit(self):
+        """Count a request that a caller answered itself from match()"""
+        self.stats["requests"] += 1
+        self.stats["routed"] += 1
+
+    def match(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Like route() but without touching the routing stats; call record_hit() when acting on a match"""
+        text = user_input.strip()
+
+        best = None
+        ambiguous = False
+        for rule in self._candidates(text):
+            if rule.confidence < self.min_confidence:
+                continue
+            params = rule.match(text)
+            if params is None:
+                continue
+            if best is None or rule.confidence > best["confidence"]:
+                best = {"tool": rule.tool_name, "params": params, "confidence": rule.confidence}
+                ambiguous = False
+            elif rule.confidence == best["confidence"] and rule.tool_name != best["tool"]:
+                ambiguous = True
+
+        if best is None or ambiguous:
+            return None
+        return best
+
+    def record_llm_latency(self, seconds: float):
+        """Record a first-round LLM call that the router could not skip"""
+        self.stats["llm_calls"] += 1
+        self.stats["llm_seconds"] += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Share of routed requests and the LLM time they are estimated to have saved"""
+        requests = self.stats["requests"]
+        routed = self.stats["routed"]
+        avg_llm = self.stats["llm_seconds"] / self.stats["llm_calls"] if self.stats["llm_calls"] else 0.0
+        return {
+            "requests": requests,
+            "routed": routed,
+            "routed_share": routed / requests if requests else 0.0,
+            "avg_llm_seconds": avg_llm,
+            "estimated_seconds_saved": routed * avg_llm
+        }
+
+
 
 # BUILDING BLOCK 4: VALIDATION
 class ValidationSchema:
@@ -169,36 +1001,79 @@ class ValidationSchema:
     
     def __init__(self):
         self.schemas: Dict[str, type[BaseModel]] = {}
+        self.adapters: Dict[str, TypeAdapter] = {}
+        self.passed: Counter = Counter()
+        self.failed: Counter = Counter()
 
     def register_schema(self, name: str, schema: type[BaseModel]):
         """Register a validation schema"""
         self.schemas[name] = schema
+        self.adapters[name] = TypeAdapter(List[schema])
         print(f" Registered schema: {name}")
 
-    def validate(self, data: Any, schema_name: str) -> BaseModel:
-        """Validates data against a registered schema"""
+    def _get_schema(self, schema_name: str) -> type[BaseModel]:
         if schema_name not in self.schemas:
             raise ValueError(f"Schema '{schema_name}' not found.")
+        return self.schemas[schema_name]
 
-        schema = self.schemas[schema_name]
+    def validate(self, data: Any, schema_name: str) -> BaseModel:
+        """Validates data against a registered schema"""
+        schema = self._get_schema(schema_name)
 
         try:
-            if isinstance(data, dict):
-                validated = schema(**data)
-            elif isinstance(data, str):
-                data_dict = json.loads(data)
-                validated = schema(**data_dict)
-            elif isinstance(data, schema):
+            if isinstance(data, schema):
                 validated = data
+            elif isinstance(data, (str, bytes, bytearray)):
+                validated = schema.model_validate_json(data)
+            elif isinstance(data, dict):
+                validated = schema.model_validate(data)
             else:
                 raise ValueError(f"Cannot validate data of type {type(data)}")
 
-            print(f" Validation passed: {schema_name}")
-            return validated
+        except ValidationError:
+            self.failed[schema_name] += 1
+            raise
+
+        self.passed[schema_name] += 1
+        return validated
+
+    def validate_many(self, data: Any, schema_name: str) -> List[BaseModel]:
+        """Validates a batch: a list of dicts, a JSON array, JSONL text or an iterable of JSONL lines"""
+        self._get_schema(schema_name)
+        adapter = self.adapters[schema_name]
+
+        if isinstance(data, (str, bytes, bytearray)):
+            if data.lstrip()[:1] in ("[", b"["):
+                return self._validate_batch(adapter.validate_json, data, schema_name)
+            data = data.splitlines()
 
+        if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+            return self._validate_batch(adapter.validate_python, data, schema_name)
+
+        validated = []
+        for item in data:
+            if isinstance(item, (str, bytes, bytearray)) and not item.strip():
+                continue
+            validated.append(self.validate(item, schema_name))
+        return validated
+
+    def _validate_batch(self, validate_fn: Callable, data: Any, schema_name: str) -> List[BaseModel]:
+        """Validates a whole batch in one pydantic-core call"""
+        try:
+            validated = validate_fn(data)
         except ValidationError as e:
-            print(f" Validation failed: {schema_name}")
-            raise e
+            self.failed[schema_name] += len({err["loc"][0] for err in e.errors() if err["loc"]}) or 1
+            raise
+
+        self.passed[schema_name] += len(validated)
+        return validated
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get pass/fail counts per schema"""
+        return {
+            name: {"passed": self.passed[name], "failed": self.failed[name]}
+            for name in self.schemas
+        }
 
 
 
@@ -207,9 +1082,10 @@ class ValidationSchema:
 class Recovery:
     """Handles errors and provides fallback mechanism"""
     
-    def __init__(self, max_retries: int = 3):
+    def __init__(self, max_retries: int = 3, max_log_entries: int = 1000, log_path: Optional[str] = None, hooks: Optional[HookBus] = None):
         self.max_retries = max_retries
-        self.error_log: List[Dict] = []
+        self.hooks = hooks
+        self.error_log = BoundedLog(max_log_entries, key=lambda record: record.function, store=log_path)
 
     def execute_with_retry(self, func: Callable, *args, fallback: Optional[Callable] = None, **kwargs) -> Any:
         """Executes a function with retry logic"""
@@ -226,12 +1102,14 @@ class Recovery:
                 last_error = e
                 print(f" Attempt {attempt + 1} failed: {str(e)}")
 
-                self.error_log.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "function": func._name_,
-                    "attempt": attempt + 1,
-                    "error": str(e)
-                })
+                record = ErrorRecord(
+                    function=getattr(func, "__name__", repr(func)),
+                    attempt=attempt + 1,
+                    error=str(e)
+                )
+                self.error_log.append(record)
+                if self.hooks:
+                    self.hooks.emit("on_retry", function=record.function, attempt=record.attempt, error=record.error)
         
         
         print(f" All {self.max_retries} attempts failed.")
@@ -250,7 +1128,7 @@ class Recovery:
         return {
             "status": "error",
             "message": "I ran into an issue and could not finish the task",
-            "error_type": type(error)._name_,
+            "error_type": type(error).__name__,
             "context": context,
             "suggestion": "Please try rephrasing your request or try again later"
         }
@@ -258,20 +1136,91 @@ class Recovery:
     def get_error_summary(self) -> Dict[str, Any]:
         """Get summary of errors encountered"""
         return {
-            "total_errors": len(self.error_log),
-            "recent_errors": self.error_log[-5:]
+            "total_errors": self.error_log.total,
+            "errors_by_function": dict(self.error_log.counts),
+            "recent_errors": [record.to_dict() for record in self.error_log.tail(5)]
         }
 
 
 
 # BUILDING BLOCK 6: FEEDBACK CONTROL
 
+class ApprovalTicket:
+    """A pending approval that can be decided from any thread"""
+
+    def __init__(self, action: str, details: Dict[str, Any], confidence: float, risk_level: str = "low"):
+        self.id = uuid.uuid4().hex[:12]
+        self.action = action
+        self.details = details
+        self.confidence = confidence
+        self.risk_level = risk_level
+        self.created = time.time()
+        self.approved: Optional[bool] = None
+        self.decided_by: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[bool]:
+        """Block this thread until decided; None if the timeout passed first"""
+        self._event.wait(timeout)
+        return self.approved
+
+    async def wait_async(self, timeout: Optional[float] = None) -> Optional[bool]:
+        """Await the decision without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.wait, timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "action": self.action,
+            "details": self.details,
+            "confidence": self.confidence,
+            "risk_level": self.risk_level,
+            "approved": self.approved,
+            "decided_by": self.decided_by
+        }
+
+
+def stdin_approver(ticket: ApprovalTicket) -> bool:
+    """Ask on the terminal, the original blocking approval prompt"""
+    print("\n" + "=" * 60)
+    print(" HUMAN APPROVAL REQUIRED")
+    print("=" * 60)
+    print(f"Action: {ticket.action}")
+    print(f"Confidence: {ticket.confidence * 100:.1f}%")
+    print(f"\nDetails:")
+    for key, value in ticket.details.items():
+        print(f"  {key}: {value}")
+    print("=" * 60)
+
+    response = input("Approve this action? (y/n): ").strip().lower()
+    return response.startswith('y')
+
+
 class FeedbackControl:
-    """Manages human-in-the-loop approval workflows"""
+    """Manages human-in-the-loop approval workflows
+
+    Approvals go through a queue of tickets. The approver callable is tried
+    first: it returns True/False to decide on the spot, or None to leave the
+    ticket pending for approve()/reject() from another thread, coroutine or
+    HTTP endpoint. approver=None is pure queue mode.
+    """
     
-    def __init__(self, auto_approve_threshold: float = 0.0):
+    def __init__(self, auto_approve_threshold: float = 0.0, approver: Optional[Callable[[ApprovalTicket], Optional[bool]]] = stdin_approver,
+                 default_timeout: Optional[float] = None, timeout_decision: bool = False,
+                 max_log_entries: int = 1000, log_path: Optional[str] = None):
+        # 0 disables the auto-approve fast path
         self.auto_approve_threshold = auto_approve_threshold
-        self.approval_log: List[Dict] = []
+        self.approver = approver
+        self.default_timeout = default_timeout
+        self.timeout_decision = timeout_decision
+        self.approval_log = BoundedLog(max_log_entries, key=lambda record: "approved" if record.approved else "rejected", store=log_path)
+        self.pending: Dict[str, ApprovalTicket] = {}
+        self._lock = threading.Lock()
 
     def requires_approval(self, action: str, confidence: float = 1.0, risk_level: str = "low") -> bool:
         """Determines if an action requires human approval"""
@@ -285,39 +1234,306 @@ class FeedbackControl:
         
         return False
 
-    def request_approval(self, action: str, details: Dict[str, Any], confidence: float = 1.0) -> bool:
-        """Request human approval for an action to be taken"""
-        print("\n" + "=" * 60)
-        print(" HUMAN APPROVAL REQUIRED")
-        print("=" * 60)
-        print(f"Action: {action}")
-        print(f"Confidence: {confidence * 100:.1f}%")
-        print(f"\nDetails:")
-        for key, value in details.items():
-            print(f"  {key}: {value}")
-        print("=" * 60)
+    def submit(self, action: str, details: Dict[str, Any], confidence: float = 1.0, risk_level: str = "low") -> ApprovalTicket:
+        """Park an action for approval and return its ticket without blocking on a human"""
+        ticket = ApprovalTicket(action, details, confidence, risk_level)
+
+        if self.auto_approve_threshold and not self.requires_approval(action, confidence, risk_level):
+            self._decide(ticket, True, "auto")
+            return ticket
 
-        response = input("Approve this action? (y/n): ").strip().lower()
-        approved = response.startswith('y')
+        with self._lock:
+            self.pending[ticket.id] = ticket
 
-        self.approval_log.append({
-            "timestamp": datetime.now().isoformat(),
-            "action": action,
-            "details": details,
-            "confidence": confidence,
-            "approved": approved
-        })
+        if self.approver:
+            try:
+                decision = self.approver(ticket)
+            except BaseException:
+                # EOFError/KeyboardInterrupt from input() must not leave the ticket pending forever
+                self.decide(ticket.id, self.timeout_decision, by="approver_error")
+                raise
+            if decision is not None:
+                self.decide(ticket.id, decision, by="approver")
+
+        return ticket
+
+    def _decide(self, ticket: ApprovalTicket, approved: bool, by: str):
+        ticket.approved = approved
+        ticket.decided_by = by
+        self.approval_log.append(ApprovalRecord(
+            action=ticket.action,
+            details=ticket.details,
+            confidence=ticket.confidence,
+            approved=approved,
+            decided_by=by
+        ), disk_fields={"details": ticket.details})
+        ticket._event.set()
+
+    def decide(self, ticket_id: str, approved: bool, by: str = "human") -> bool:
+        """Record a decision for a pending ticket; False if it was already decided"""
+        with self._lock:
+            ticket = self.pending.pop(ticket_id, None)
+        if ticket is None:
+            return False
+        self._decide(ticket, approved, by)
+        return True
+
+    def approve(self, ticket_id: str, by: str = "human") -> bool:
+        """Approve a pending ticket"""
+        return self.decide(ticket_id, True, by)
+
+    def reject(self, ticket_id: str, by: str = "human") -> bool:
+        """Reject a pending ticket"""
+        return self.decide(ticket_id, False, by)
+
+    def decide_many(self, ticket_ids: Optional[List[str]] = None, approved: bool = True, by: str = "human") -> int:
+        """Decide several pending tickets at once (all of them when ticket_ids is None)"""
+        with self._lock:
+            ids = list(self.pending) if ticket_ids is None else ticket_ids
+        return sum(self.decide(ticket_id, approved, by) for ticket_id in ids)
+
+    def list_pending(self) -> List[ApprovalTicket]:
+        """Tickets still waiting for a decision, oldest first"""
+        with self._lock:
+            return sorted(self.pending.values(), key=lambda ticket: ticket.created)
+
+    def wait(self, ticket: ApprovalTicket, timeout: Optional[float] = None) -> bool:
+        """Block until the ticket is decided, applying timeout_decision if it times out"""
+        timeout = self.default_timeout if timeout is None else timeout
+        if ticket.wait(timeout) is None:
+            self.decide(ticket.id, self.timeout_decision, by="timeout")
+        return bool(ticket.approved)
+
+    def request_approval(self, action: str, details: Dict[str, Any], confidence: float = 1.0, risk_level: str = "low", timeout: Optional[float] = None) -> bool:
+        """Request human approval for an action to be taken"""
+        ticket = self.submit(action, details, confidence, risk_level)
+        approved = self.wait(ticket, timeout)
 
         if approved:
-            print(" Action approved by human")
+            print(f" Action approved ({ticket.decided_by})")
         else:
-            print("Action rejected by human")
+            print(f"Action rejected ({ticket.decided_by})")
 
         return approved
 
-    def get_approval_history(self) -> List[Dict]:
-        """Get history of approval decisions"""
-        return self.approval_log
+    def get_approval_history(self, last_n: Optional[int] = None) -> List[Dict]:
+        """Get recent approval decisions as dicts; approval_log.query() searches the full history"""
+        records = self.approval_log.tail(last_n) if last_n else list(self.approval_log)
+        return [record.to_dict() for record in records]
+
+    def get_approval_summary(self) -> Dict[str, int]:
+        """Get approval counts without walking the log"""
+        return {
+            "total": self.approval_log.total,
+            "approved": self.approval_log.counts["approved"],
+            "rejected": self.approval_log.counts["rejected"]
+        }
+
+
+def start_approval_server(feedback: FeedbackControl, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Serve the approval queue over HTTP on a background thread.
+
+    GET  /approvals                   list pending tickets
+    POST /approvals/<id>/approve      approve one ticket
+    POST /approvals/<id>/reject       reject one ticket
+    POST /approvals/approve-all       approve every pending ticket
+    POST /approvals/reject-all        reject every pending ticket
+    """
+
+    class ApprovalHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: Any):
+            body = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/approvals":
+                self._reply(200, [ticket.to_dict() for ticket in feedback.list_pending()])
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            parts = self.path.strip("/").split("/")
+            if parts == ["approvals", "approve-all"] or parts == ["approvals", "reject-all"]:
+                count = feedback.decide_many(approved=parts[1] == "approve-all", by="http")
+                self._reply(200, {"decided": count})
+            elif len(parts) == 3 and parts[0] == "approvals" and parts[2] in ("approve", "reject"):
+                ok = feedback.decide(parts[1], parts[2] == "approve", by="http")
+                self._reply(200 if ok else 404, {"decided": ok})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ApprovalHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f" Approval server listening on http://{host}:{server.server_address[1]}/approvals")
+    return server
+
+
+
+# PLANNING
+
+class PlanParam(BaseModel):
+    name: str
+    value: str
+
+
+class PlanStep(BaseModel):
+    id: str
+    tool: str
+    params: List[PlanParam]
+    depends_on: List[str]
+
+
+class ResearchPlan(BaseModel):
+    steps: List[PlanStep]
+
+
+class PlanExecutor:
+    """Runs a ResearchPlan as a DAG: each step starts as soon as its dependencies finish
+
+    Param values may reference earlier results as {step_id} (the compact
+    result) or {step_id.field}; a reference implies a dependency. Braces
+    around anything that is not a step id are left as literal text.
+    Identical steps (same tool and resolved params) run once per plan.
+    """
+
+    REFERENCE = re.compile(r"\{(\w+)(?:\.(\w+))?\}")
+
+    def __init__(self, execute_tool: Callable[..., Any], projector: ResultProjector, max_workers: int = 8):
+        self.execute_tool = execute_tool
+        self.projector = projector
+        self.max_workers = max_workers
+
+    def dependencies(self, step: PlanStep, step_ids: set) -> set:
+        referenced = {match.group(1) for param in step.params for match in self.REFERENCE.finditer(param.value)}
+        return set(step.depends_on) | (referenced & step_ids)
+
+    def check(self, plan: ResearchPlan, tool_names: List[str]) -> Dict[str, set]:
+        """Reject duplicate ids, unknown tools or dependencies, and cycles"""
+        steps = {}
+        for step in plan.steps:
+            if step.id in steps:
+                raise ValueError(f"Duplicate plan step '{step.id}'")
+            if step.tool not in tool_names:
+                raise ValueError(f"Plan step '{step.id}' uses unknown tool '{step.tool}'")
+            steps[step.id] = step
+
+        graph = {}
+        for step in plan.steps:
+            deps = self.dependencies(step, steps.keys())
+            unknown = deps - steps.keys()
+            if unknown:
+                raise ValueError(f"Plan step '{step.id}' depends on unknown step(s): {', '.join(sorted(unknown))}")
+            graph[step.id] = deps
+
+        remaining = {step_id: set(deps) for step_id, deps in graph.items()}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Plan has a dependency cycle among: {', '.join(sorted(remaining))}")
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return graph
+
+    def _resolve(self, value: str, results: Dict[str, Any]) -> str:
+        def replace(match) -> str:
+            if match.group(1) not in results:
+                return match.group(0)
+            result = results[match.group(1)]
+            if isinstance(result, dict) and "success" in result:
+                result = result.get("result") if result["success"] else result
+            if match.group(2):
+                item = result[0] if isinstance(result, list) and result else result
+                return str(item.get(match.group(2), "")) if isinstance(item, dict) else ""
+            return self.projector.project(None, result)
+        return self.REFERENCE.sub(replace, value)
+
+    def _run_step(self, step: PlanStep, results: Dict[str, Any], cache: Dict[str, Future], lock: threading.Lock) -> tuple:
+        params = {param.name: self._resolve(param.value, results) for param in step.params}
+        key = f"{step.tool}:{json.dumps(params, sort_keys=True)}"
+        with lock:
+            pending = cache.get(key)
+            if pending is None:
+                # Claim the key before running so identical steps started alongside wait for this one
+                cache[key] = Future()
+        if pending is not None:
+            return pending.result(), 0.0, True
+
+        started = time.perf_counter()
+        try:
+            result = self.execute_tool(step.tool, **params)
+        except Exception as e:
+            with lock:
+                cache.pop(key).set_exception(e)
+            raise
+        elapsed = time.perf_counter() - started
+
+        with lock:
+            future = cache[key]
+            # Later duplicates retry a failed step; those already waiting share its result
+            if not (isinstance(result, dict) and result.get("success")):
+                del cache[key]
+        future.set_result(result)
+        return result, elapsed, False
+
+    def execute(self, plan: ResearchPlan, graph: Dict[str, set]) -> tuple:
+        """Run every step; returns (results by step id, timing stats)"""
+        steps = {step.id: step for step in plan.steps}
+        waiting = {step_id: set(deps) for step_id, deps in graph.items()}
+        results: Dict[str, Any] = {}
+        # Only lives for this plan, so a later request never sees stale tool output
+        cache: Dict[str, Future] = {}
+        lock = threading.Lock()
+        stats = {"steps": len(steps), "cached": 0, "step_seconds": 0.0, "wall_seconds": 0.0}
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+
+            def launch():
+                ready = [step_id for step_id, deps in waiting.items() if not deps]
+                while ready:
+                    step_id = ready.pop(0)
+                    del waiting[step_id]
+                    failed = [dep for dep in graph[step_id] if not results[dep].get("success")]
+                    if failed:
+                        results[step_id] = {"success": False, "error": f"Skipped: step '{failed[0]}' failed"}
+                        finish(step_id)
+                        ready.extend(other for other, deps in waiting.items() if not deps and other not in ready)
+                        continue
+                    # Each worker gets its own copy so hook request ids carry over
+                    context = copy_context()
+                    running[pool.submit(context.run, self._run_step, steps[step_id], dict(results), cache, lock)] = step_id
+
+            def finish(step_id):
+                for deps in waiting.values():
+                    deps.discard(step_id)
+
+            launch()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    try:
+                        result, elapsed, cached = future.result()
+                    except Exception as e:
+                        result, elapsed, cached = {"success": False, "error": str(e)}, 0.0, False
+                    results[step_id] = result
+                    stats["step_seconds"] += elapsed
+                    stats["cached"] += cached
+                    finish(step_id)
+                launch()
+
+        stats["wall_seconds"] = time.perf_counter() - started
+        return results, stats
 
 
 
@@ -326,7 +1542,10 @@ class FeedbackControl:
 class Agent:
     """Universal AI Agent with all 6 building blocks"""
     
-    def __init__(self, name: str, system_prompt: str, model: str = "gpt-4o", require_approval: bool = False, max_retries: int = 3, max_history: int = 100):
+    def __init__(self, name: str, system_prompt: str, model: str = "gpt-4o", require_approval: bool = False, max_retries: int = 3, max_history: int = 100, use_router: bool = True, tool_result_tokens: int = 800,
+                 approver: Optional[Callable[[ApprovalTicket], Optional[bool]]] = stdin_approver, approval_timeout: Optional[float] = None,
+                 cassette: Optional[Cassette] = None, max_log_entries: int = 1000,
+                 error_log_path: Optional[str] = None, approval_log_path: Optional[str] = None):
         self.name = name
         self.system_prompt = system_prompt
         self.require_approval = require_approval
@@ -334,22 +1553,28 @@ class Agent:
         print(f"\n Initializing Agent: {name}")
         print("=" * 60)
         
-        self.intelligence = Intelligence(model=model)
+        self.hooks = HookBus()
+
+        self.intelligence = Intelligence(model=model, cassette=cassette)
         print("Intelligence initialized")
         
-        self.memory = Memory(max_history=max_history)
+        self.memory = Memory(max_history=max_history, hooks=self.hooks)
         print(" Memory initialized")
         
         self.tools = ToolRegistry()
+        self.router = IntentRouter() if use_router else None
+        self.result_projector = ResultProjector(max_tokens=tool_result_tokens)
+        self.planner = PlanExecutor(self.execute_tool, self.result_projector)
         print("Tools initialized")
         
         self.validation = ValidationSchema()
         print(" Validation initialized")
         
-        self.recovery = Recovery(max_retries=max_retries)
+        self.recovery = Recovery(max_retries=max_retries, max_log_entries=max_log_entries, log_path=error_log_path, hooks=self.hooks)
         print(" Recovery initialized")
         
-        self.feedback = FeedbackControl()
+        self.feedback = FeedbackControl(approver=approver, default_timeout=approval_timeout,
+                                        max_log_entries=max_log_entries, log_path=approval_log_path)
         print(" Feedback Control initialized")
         
         self.logger = logging.getLogger(f"Agent.{name}")
@@ -357,8 +1582,36 @@ class Agent:
         print("=" * 60)
         print(f" Agent '{name}' ready!\n")
 
-    def run(self, user_input: str, use_memory: bool = True, require_approval: Optional[bool] = None) -> str:
-        """Main method to process user input through all building blocks"""
+    def run(self, user_input: str, use_memory: bool = True, require_approval: Optional[bool] = None, plan: bool = False) -> str:
+        """Main method to process user input through all building blocks
+
+        plan=True asks for a multi-step tool plan instead of a single tool call.
+        """
+        token = self.hooks.current_request.set(uuid.uuid4().hex[:12])
+        started = time.perf_counter()
+        response = None
+        self.hooks.emit("before_run", user_input=user_input)
+        try:
+            response = self._run(user_input, use_memory, require_approval, plan)
+            return response
+        finally:
+            self.hooks.emit("after_run", user_input=user_input, response=response, seconds=time.perf_counter() - started)
+            self.hooks.current_request.reset(token)
+
+    def _generate(self, prompt: str) -> str:
+        """One LLM completion with retries, wrapped in the before_llm/after_llm hooks"""
+        self.hooks.emit("before_llm", prompt=prompt, system_prompt=self.system_prompt)
+        started = time.perf_counter()
+        response = self.recovery.execute_with_retry(
+            self.intelligence.generate_decision,
+            prompt=prompt,
+            system_prompt=self.system_prompt,
+            temperature=0.7
+        )
+        self.hooks.emit("after_llm", prompt=prompt, response=response, seconds=time.perf_counter() - started)
+        return response
+
+    def _run(self, user_input: str, use_memory: bool, require_approval: Optional[bool], plan: bool = False) -> str:
         print(f"\n{'=' * 60}")
         print(f"Processing: {user_input[:50]}...")
         print(f"{'=' * 60}\n")
@@ -370,16 +1623,28 @@ class Agent:
                 context = self.memory.get_context(last_n=3)
                 print(f"   Found {len(self.memory.conversation_history)} previous interactions")
 
-            print("\nGenerating AI response...")
+            tool_name = None
+            params = {}
+            response = ""
+
+            route = self.router.route(user_input) if self.router and not plan else None
+            if plan:
+                response = self._run_plan(user_input, context)
+            elif route:
+                tool_name = route["tool"]
+                params = route["params"]
+                print(f"\nRouted to {tool_name} without LLM (confidence {route['confidence']:.2f})")
+            else:
+                print("\nGenerating AI response...")
 
-            full_prompt = user_input
-            if context:
-                full_prompt = f"Previous conversation:\n{context}\n\nCurrent request: {user_input}"
+                full_prompt = user_input
+                if context:
+                    full_prompt = f"Previous conversation:\n{context}\n\nCurrent request: {user_input}"
 
-            if self.tools.list_tools():
-                tools_info = self.tools.get_tool_description()
-                full_prompt += f"\n\nAvailable tools:\n{tools_info}"
-                full_prompt += """\n\nTo use a tool, respond with EXACTLY this format:
+                if self.tools.list_tools():
+                    tools_info = self.tools.get_tool_description()
+                    full_prompt += f"\n\nAvailable tools:\n{tools_info}"
+                    full_prompt += """\n\nTo use a tool, respond with EXACTLY this format:
 USE_TOOL: tool_name
 PARAMS: param1=value1, param2=value2
 
@@ -389,54 +1654,44 @@ PARAMS: city=Lagos
 
 After using a tool, provide a natural response to the user."""
 
-            response = self.recovery.execute_with_retry(
-                self.intelligence.generate_decision,
-                prompt=full_prompt,
-                system_prompt=self.system_prompt,
-                temperature=0.7
-            )
-
-            print(f"   Response generated ({len(response)} chars)")
+                started = time.perf_counter()
+                response = self._generate(full_prompt)
+                if self.router:
+                    self.router.record_llm_latency(time.perf_counter() - started)
 
-            # Check if AI wants to use a tool
-            if "USE_TOOL:" in response:
-                lines = response.split('\n')
-                tool_name = None
-                params = {}
+                print(f"   Response generated ({len(response)} chars)")
 
-                for line in lines:
-                    if line.startswith("USE_TOOL:"):
-                        tool_name = line.replace("USE_TOOL:", "").strip()
-                    elif line.startswith("PARAMS:"):
-                        params_str = line.replace("PARAMS:", "").strip()
-                        for param in params_str.split(','):
-                            if '=' in param:
-                                key, value = param.split('=', 1)
-                                params[key.strip()] = value.strip()
+                # Check if AI wants to use a tool
+                if "USE_TOOL:" in response:
+                    for line in response.split('\n'):
+                        if line.startswith("USE_TOOL:"):
+                            tool_name = line.replace("USE_TOOL:", "").strip()
+                        elif line.startswith("PARAMS:"):
+                            params_str = line.replace("PARAMS:", "").strip()
+                            for param in params_str.split(','):
+                                if '=' in param:
+                                    key, value = param.split('=', 1)
+                                    params[key.strip()] = value.strip()
 
-                if tool_name:
-                    print(f"\nAI requested tool: {tool_name}")
-                    print(f"   Parameters: {params}")
+            if tool_name:
+                print(f"\nAI requested tool: {tool_name}")
+                print(f"   Parameters: {params}")
 
-                    try:
-                        tool_result = self.execute_tool(tool_name, **params)
+                try:
+                    tool_result = self.execute_tool(tool_name, **params)
+                    compact_result = self.result_projector.project(self.tools.tools.get(tool_name), tool_result)
 
-                        final_prompt = f"""Original user request: {user_input}
+                    final_prompt = f"""Original user request: {user_input}
 
 Tool used: {tool_name}
-Tool result: {json.dumps(tool_result, indent=2)}
+Tool result: {compact_result}
 
 Based on this data, provide a clear, natural language response to the user.
 Don't mention the tool or technical details - just give them the information they asked for."""
 
-                        response = self.recovery.execute_with_retry(
-                            self.intelligence.generate_decision,
-                            prompt=final_prompt,
-                            system_prompt=self.system_prompt,
-                            temperature=0.7
-                        )
-                    except Exception as e:
-                        response = f"I tried to get that information but encountered an error: {str(e)}"
+                    response = self._generate(final_prompt)
+                except Exception as e:
+                    response = f"I tried to get that information but encountered an error: {str(e)}"
 
             needs_approval = require_approval if require_approval is not None else self.require_approval
 
@@ -468,13 +1723,65 @@ Don't mention the tool or technical details - just give them the information the
             return response
 
         except Exception as e:
-            print(f"\n Error encountered: {type(e)._name_}")
+            print(f"\n Error encountered: {type(e).__name__}")
             error_response = self.recovery.graceful_failure(e, context="run method")
             return json.dumps(error_response, indent=2)
 
+    def _run_plan(self, user_input: str, context: str = "") -> str:
+        """Plan tool steps once, run them as a DAG, then answer in one synthesis call"""
+        if "research_plan" not in self.validation.schemas:
+            self.validation.register_schema("research_plan", ResearchPlan)
+
+        print("\nPlanning research steps...")
+        history = f"Previous conversation:\n{context}\n" if context else ""
+        plan_prompt = f"""Break this request into tool calls.
+
+Request: {user_input}
+{history}
+Available tools:
+{self.tools.get_tool_description()}
+
+Return steps with a short unique id, the tool name, its params as name/value pairs
+and the ids of the steps it depends on. Steps with no dependency between them run
+in parallel, so only add a dependency when a step needs an earlier result.
+To use an earlier result in a param, write {{step_id}} or {{step_id.field}}."""
+
+        plan = self.recovery.execute_with_retry(
+            self.intelligence.structured_output,
+            prompt=plan_prompt,
+            response_model=ResearchPlan,
+            system_prompt=self.system_prompt
+        )
+        plan = self.validation.validate(plan.model_dump(), "research_plan")
+        graph = self.planner.check(plan, self.tools.list_tools())
+        print(f"   Plan has {len(plan.steps)} steps")
+
+        results, stats = self.planner.execute(plan, graph)
+        print(f"   Ran {stats['steps']} steps in {stats['wall_seconds']:.2f}s "
+              f"({stats['step_seconds']:.2f}s of tool time, {stats['cached']} cached)")
+
+        findings = []
+        for step in plan.steps:
+            params = ", ".join(f"{param.name}={param.value}" for param in step.params)
+            compact = self.result_projector.project(self.tools.tools.get(step.tool), results[step.id])
+            findings.append(f"[{step.id}] {step.tool}({params}): {compact}")
+        findings = "\n".join(findings)
+
+        final_prompt = f"""Original user request: {user_input}
+
+Research results:
+{findings}
+
+Based on this data, provide a clear, natural language response to the user.
+Don't mention the tool or technical details - just give them the information they asked for."""
+
+        return self._generate(final_prompt)
+
     def register_tool(self, tool: Tool):
         """Register a new tool for the agent"""
         self.tools.register(tool)
+        if self.router:
+            self.router.index_tool(tool)
 
     def register_schema(self, name: str, schema: type[BaseModel]):
         """Register a validation schema"""
@@ -482,7 +1789,15 @@ Don't mention the tool or technical details - just give them the information the
 
     def execute_tool(self, tool_name: str, **kwargs) -> Any:
         """Execute a registered tool"""
-        return self.tools.execute(tool_name, **kwargs)
+        self.hooks.emit("before_tool", tool_name=tool_name, params=kwargs)
+        started = time.perf_counter()
+        result = self.tools.execute(tool_name, **kwargs)
+        self.hooks.emit("after_tool", tool_name=tool_name, params=kwargs, result=result, seconds=time.perf_counter() - started)
+        return result
+
+    def add_hook(self, event: str, handler: Callable):
+        """Register a lifecycle hook, see HookBus.EVENTS"""
+        self.hooks.register(event, handler)
 
     def get_status(self) -> Dict[str, Any]:
         """Get agent status and statistics"""
@@ -491,5 +1806,6 @@ Don't mention the tool or technical details - just give them the information the
             "memory": self.memory.get_summary(),
             "tools": self.tools.list_tools(),
             "errors": self.recovery.get_error_summary(),
-            "approvals": len(self.feedback.approval_log)
+            "approvals": self.feedback.approval_log.total,
+            "router": self.router.get_stats() if self.router else None
         }
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Result-page extraction: the old find_all fallbacks vs ExtractionRules, on saved fixtures.
+
+Run: python benchmarks/bench_extraction.py [repeats]
+"""
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import GOOGLE_RESULT_RULES, NEWS_ARTICLE_RULES  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def old_google(soup, num_results):
+    """GoogleSearchTool's previous extraction loop"""
+    results = []
+    search_results = soup.find_all('div', class_='g')
+    if not search_results:
+        search_results = soup.find_all('div', {'data-sokoban-container': True})
+    if not search_results:
+        search_results = soup.find_all('div', class_='tF2Cxc')
+    for g in search_results[:num_results]:
+        title_elem = g.find('h3')
+        if not title_elem:
+            continue
+        title = title_elem.get_text()
+        link_elem = g.find('a')
+        if not link_elem or 'href' not in link_elem.attrs:
+            continue
+        link = link_elem['href']
+        snippet = ""
+        snippet_elem = g.find('div', class_='VwiC3b')
+        if not snippet_elem:
+            snippet_elem = g.find('span', class_='aCOpRe')
+        if not snippet_elem:
+            snippet_elem = g.find('div', class_='s')
+        if snippet_elem:
+            snippet = snippet_elem.get_text()
+        if snippet_elem:
+            snippet = snippet_elem.get_text()
+        results.append({"title": title, "link": link, "snippet": snippet})
+    return results
+
+
+def old_news(soup, limit):
+    """NewsScrapperTool's previous extraction loop"""
+    articles = []
+    for article in soup.find_all('article')[:limit]:
+        title_element = article.find('a')
+        if title_element and title_element.get_text(strip=True):
+            articles.append({"title": title_element.get_text(strip=True), "link": title_element.get('href', '')})
+    if not articles:
+        for link in soup.find_all('a', href=True)[:15]:
+            link.get_text(strip=True)
+    return articles
+
+
+def timed(label, fn, soup, limit, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        results = fn(soup, limit)
+    elapsed = (time.perf_counter() - start) / repeats * 1000
+    print(f"  {label:<16} {elapsed:7.2f} ms  {len(results)} results")
+    return results
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cases = [
+        ("google_results.html", old_google, GOOGLE_RESULT_RULES.extract, 5),
+        ("google_results_fallback.html", old_google, GOOGLE_RESULT_RULES.extract, 5),
+        ("news_results.html", old_news, NEWS_ARTICLE_RULES.extract, 10),
+    ]
+    for name, old, new, limit in cases:
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+        print(name)
+        before = timed("find_all", old, soup, limit, repeats)
+        after = timed("ExtractionRules", new, soup, limit, repeats)
+        same = [(r["title"], r["link"]) for r in before] == [(r["title"], r["link"]) for r in after]
+        print(f"  same titles/links: {same}")
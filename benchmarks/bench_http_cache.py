@@ -0,0 +1,86 @@
+"""HttpCache against a local server that answers conditional GETs with 304.
+
+Run: python benchmarks/bench_http_cache.py [requests]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import HttpCache  # noqa: E402
+
+BODY = b'{"title": "Bitcoin", "extract": "' + b"Bitcoin is a decentralized digital currency. " * 400 + b'"}'
+ETAG = '"' + hashlib.md5(BODY).hexdigest() + '"'
+LATENCY = 0.02
+
+
+class Handler(BaseHTTPRequestHandler):
+    cache_control = "no-cache"
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Cache-Control", self.cache_control)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.send_header("ETag", ETAG)
+        self.send_header("Cache-Control", self.cache_control)
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label: str, fetch, url: str, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        response = fetch(url)
+        assert response.content == BODY
+    elapsed = (time.perf_counter() - start) / count * 1000
+    print(f"{label:<34} {elapsed:7.2f} ms/request")
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/page/summary/Bitcoin"
+
+    session = requests.Session()
+    run("no cache", lambda u: session.get(u, timeout=10), url, count)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = HttpCache(cache_dir=cache_dir)
+        run("revalidate (If-None-Match -> 304)", lambda u: cache.get(u), url, count)
+        print(f"  {cache.stats}")
+
+        Handler.cache_control = "max-age=60"
+        cache = HttpCache(cache_dir=cache_dir)
+        cache.clear()
+        run("fresh (max-age=60)", lambda u: cache.get(u), url, count)
+        print(f"  {cache.stats}")
+
+        Handler.cache_control = "max-age=0, stale-while-revalidate=60"
+        cache = HttpCache(cache_dir=cache_dir)
+        cache.clear()
+        run("stale-while-revalidate", lambda u: cache.get(u), url, count)
+        while cache._revalidating:
+            time.sleep(0.01)
+        print(f"  {cache.stats}")
+
+    print(f"Body size {len(BODY):,} bytes; uncached run downloaded {len(BODY) * count:,} bytes")
+    server.shutdown()
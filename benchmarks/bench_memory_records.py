@@ -0,0 +1,54 @@
+"""Bytes per stored interaction: plain dicts vs slotted Interaction records.
+
+Run: python benchmarks/bench_memory_records.py [count]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_framework import Memory  # noqa: E402
+
+USER_INPUT = "What's the weather in Lagos?"
+AGENT_RESPONSE = "It is 29C and partly cloudy in Lagos."
+
+
+def fill_dicts(count: int) -> list:
+    """The old layout: one dict and one ISO string per interaction"""
+    history = []
+    for _ in range(count):
+        history.append({
+            "timestamp": datetime.now().isoformat(),
+            "user_input": USER_INPUT,
+            "agent_response": AGENT_RESPONSE,
+            "metadata": {}
+        })
+    return history
+
+
+def fill_records(count: int) -> Memory:
+    memory = Memory(max_history=count)
+    for _ in range(count):
+        memory.add_interaction(USER_INPUT, AGENT_RESPONSE)
+    return memory
+
+
+def measure(label: str, fill, count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = fill(count)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} {current / count:8.1f} bytes/interaction  {elapsed:6.2f}s")
+    del kept
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Storing {count:,} interactions")
+    measure("dict", fill_dicts, count)
+    measure("Interaction", fill_records, count)
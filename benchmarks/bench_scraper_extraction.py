@@ -0,0 +1,100 @@
+"""webscraperTool content extraction: quality and speed on saved pages of one site.
+
+Quality is the share of the returned characters that come from the
+article body (precision), the share of the article body that fits in the
+budget and was returned (recall), and how many known boilerplate blocks
+leaked into the output. Two edge pages (a short status page and a list
+of links) check that no extractor comes back empty.
+
+Run: python benchmarks/bench_scraper_extraction.py [repeats]
+"""
+import difflib
+import json
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import BoilerplateIndex, extract_main_text  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MAX_CHARS = 2000
+
+
+def old_extract(soup, url=""):
+    """webscraperTool's previous text reconstruction"""
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split(" "))
+    return ''.join(chunk for chunk in chunks if chunk)[:MAX_CHARS]
+
+
+def get_text_extract(soup, url=""):
+    """Whitespace-preserving get_text, for reference"""
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return " ".join(soup.get_text(" ").split())[:MAX_CHARS]
+
+
+def quality(output, gold, boilerplate):
+    body = " ".join(gold)
+    blocks = difflib.SequenceMatcher(None, output, body, autojunk=False).get_matching_blocks()
+    matched = sum(block.size for block in blocks if block.size >= 20)
+    precision = matched / len(output) if output else 0.0
+    recall = matched / min(len(body), MAX_CHARS)
+    leaked = sum(1 for block in boilerplate if block in output)
+    return precision, min(recall, 1.0), leaked
+
+
+def run(label, extract, pages, meta, repeats):
+    outputs = {}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        index = BoilerplateIndex()
+        for name, html in pages:
+            soup = BeautifulSoup(html, "html.parser")
+            outputs[name] = extract(soup, url=f"{meta['host']}/{name}", index=index)
+    elapsed = (time.perf_counter() - start) / (repeats * len(pages)) * 1000
+
+    print(f"{label}  ({elapsed:.2f} ms/page incl. parsing)")
+    for name, _ in pages:
+        precision, recall, leaked = quality(outputs[name], meta["gold"][name], meta["boilerplate"])
+        print(f"  {name:<16} precision {precision:5.0%}  recall {recall:5.0%}  boilerplate blocks {leaked}")
+
+
+def run_edge_cases(extractors):
+    """Pages with no article-like block should still return their text"""
+    print("edge pages (chars returned)")
+    for name in ("edge_short.html", "edge_links.html"):
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+            html = f.read()
+        sizes = []
+        for label, extract in extractors:
+            output = extract(BeautifulSoup(html, "html.parser"), url=f"example.com/{name}", index=BoilerplateIndex())
+            sizes.append(f"{label} {len(output)}")
+            assert output, f"{label} returned nothing for {name}"
+        print(f"  {name:<16} " + "  ".join(sizes))
+
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open(os.path.join(FIXTURES, "site_gold.json")) as f:
+        meta = json.load(f)
+    pages = []
+    for name in sorted(meta["gold"]):
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+            pages.append((name, f.read()))
+
+    run("old join", lambda soup, url, index: old_extract(soup), pages, meta, repeats)
+    run("get_text", lambda soup, url, index: get_text_extract(soup), pages, meta, repeats)
+    run("density only", lambda soup, url, index: extract_main_text(soup, MAX_CHARS, None, url), pages, meta, repeats)
+    run("density + host index", lambda soup, url, index: extract_main_text(soup, MAX_CHARS, index, url), pages, meta, repeats)
+    run_edge_cases([
+        ("get_text", lambda soup, url, index: get_text_extract(soup)),
+        ("density + host index", lambda soup, url, index: extract_main_text(soup, MAX_CHARS, index, url)),
+    ])
@@ -0,0 +1,56 @@
+"""Prompt tokens for tool results: json.dumps(indent=2) vs ResultProjector.
+
+Run: python benchmarks/bench_tool_results.py [max_tokens]
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import GoogleSearchTool, NewsScrapperTool, WeatherTool, webscraperTool, wikipediaTool  # noqa: E402
+from agent_framework import ResultProjector, estimate_tokens  # noqa: E402
+
+PAGE_TEXT = (
+    "Home About Products Pricing Blog Contact Accept cookies We use cookies to improve your experience. "
+    "Python is a high-level, general-purpose programming language. Its design philosophy emphasizes code "
+    "readability with the use of significant indentation. " * 12
+)[:2000]
+
+SAMPLES = [
+    (webscraperTool(), {"url": "https://example.com/python", "title": "Python - Example", "content": PAGE_TEXT, "status": "success"}),
+    (GoogleSearchTool(), [
+        {"title": f"Python tutorial part {i}", "link": f"https://example.com/tutorial/{i}",
+         "snippet": "Learn Python step by step with examples covering syntax, data structures, modules and packages. " * 3}
+        for i in range(5)
+    ]),
+    (wikipediaTool(), {
+        "title": "Bitcoin",
+        "summary": "Bitcoin is the first decentralized cryptocurrency. Nodes in the peer-to-peer bitcoin network verify transactions through cryptography and record them in a public distributed ledger, called a blockchain, without central oversight.",
+        "url": "https://en.wikipedia.org/wiki/Bitcoin",
+        "status": "success"
+    }),
+    (NewsScrapperTool(), [
+        {"title": f"Quantum computing breakthrough number {i} announced by researchers", "link": f"https://news.google.com/articles/CBMi{i:04d}abcdefghijklmnopqrstuvwxyz"}
+        for i in range(10)
+    ]),
+    (WeatherTool(), {
+        "city": "Tokyo", "temperature_c": "18", "temperature_f": "64", "condition": "Partly cloudy", "humidity": "72",
+        "wind_speed_Kmph": "11", "feels_like_c": "17", "feels_like_f": "63", "observation_time": "06:14 AM"
+    }),
+]
+
+
+if __name__ == "__main__":
+    max_tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    projector = ResultProjector(max_tokens=max_tokens)
+    total_before = total_after = 0
+    print(f"{'tool':<16} {'indent=2':>9} {'projected':>10} {'saved':>7}")
+    for tool, result in SAMPLES:
+        envelope = {"success": True, "result": result}
+        before = estimate_tokens(json.dumps(envelope, indent=2))
+        after = estimate_tokens(projector.project(tool, envelope))
+        total_before += before
+        total_after += after
+        print(f"{tool.name:<16} {before:>9} {after:>10} {1 - after / before:>7.0%}")
+    print(f"{'total':<16} {total_before:>9} {total_after:>10} {1 - total_after / total_before:>7.0%}")
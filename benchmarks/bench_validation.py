@@ -0,0 +1,58 @@
+"""ValidationSchema throughput on 100k records: old json.loads path vs pydantic-core.
+
+Run: python benchmarks/bench_validation.py [count]
+"""
+import json
+import os
+import sys
+import time
+
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_framework import ValidationSchema  # noqa: E402
+
+
+class WeatherReport(BaseModel):
+    city: str
+    temperature_c: float
+    condition: str
+    humidity: int
+
+
+def make_records(count: int) -> list:
+    return [
+        json.dumps({"city": f"City{i}", "temperature_c": i % 40, "condition": "Sunny", "humidity": i % 100})
+        for i in range(count)
+    ]
+
+
+def old_validate(data: str) -> BaseModel:
+    """The previous string path, minus its per-call print"""
+    data_dict = json.loads(data)
+    return WeatherReport(**data_dict)
+
+
+def timed(label: str, fn, count: int):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:6.3f}s  {count / elapsed:12,.0f} records/s")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+    jsonl = "\n".join(records)
+    array = "[" + ",".join(records) + "]"
+
+    validation = ValidationSchema()
+    validation.register_schema("weather", WeatherReport)
+
+    print(f"Validating {count:,} records")
+    timed("json.loads + schema(**d)", lambda: [old_validate(r) for r in records], count)
+    timed("validate (str)", lambda: [validation.validate(r, "weather") for r in records], count)
+    timed("validate_many (JSONL)", lambda: validation.validate_many(jsonl, "weather"), count)
+    timed("validate_many (JSON array)", lambda: validation.validate_many(array, "weather"), count)
+    print(validation.get_stats())